@@ -0,0 +1,162 @@
+import logging
+import math
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+class PriceAnomalyDetector:
+    """Detect sudden price moves against an exponentially weighted baseline.
+
+    For every (account, product, price field) an EWMA and EW variance are
+    kept with a time constant of window_hours, so irregular check
+    intervals are weighted correctly and each new point is an O(1) update.
+    State lives in memory and is persisted to SQLite once per run.
+    """
+
+    def __init__(self, db_path="price_history.db", window_hours=168, threshold_pct=30,
+                 min_points=5, fields=("marketing_seller_price", "marketing_price")):
+        self.db_path = db_path
+        self.window_hours = window_hours
+        self.threshold = threshold_pct / 100
+        self.min_points = min_points
+        self.fields = tuple(fields)
+        self.state = None
+        self.dirty = {}
+        # Stats of series before the current run changed them, for discard()
+        self.previous = {}
+        self.anomalies = []
+        self.lock = threading.Lock()
+
+    def connect(self):
+        """Open the history database, creating the table if needed"""
+        db = sqlite3.connect(self.db_path)
+        try:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS price_stats (
+                    account TEXT NOT NULL,
+                    product_id TEXT NOT NULL,
+                    field TEXT NOT NULL,
+                    ewma REAL NOT NULL,
+                    ewvar REAL NOT NULL,
+                    points INTEGER NOT NULL,
+                    last_price REAL NOT NULL,
+                    last_alerted REAL,
+                    updated REAL NOT NULL,
+                    PRIMARY KEY (account, product_id, field)
+                )
+            """)
+        except Exception:
+            db.close()
+            raise
+        return db
+
+    def load(self):
+        """Load the stored statistics into memory"""
+        self.state = {}
+        with closing(self.connect()) as db:
+            for account, product_id, field, *stats in db.execute("SELECT * FROM price_stats"):
+                self.state[(account, product_id, field)] = stats
+        logger.info(f"Loaded price statistics for {len(self.state)} series")
+
+    def observe(self, items, account, checked_at):
+        """Update statistics with one page of price items and collect anomalies"""
+        with self.lock:
+            if self.state is None:
+                self.load()
+
+            now = checked_at.timestamp()
+            tau = self.window_hours * 3600
+            for item in items:
+                price_data = item.get("price", {})
+                product_id = str(item.get("product_id", ""))
+                for field in self.fields:
+                    try:
+                        price = float(price_data.get(field) or 0)
+                    except (TypeError, ValueError):
+                        continue
+                    if price <= 0:
+                        continue
+
+                    key = (account, product_id, field)
+                    stats = self.state.get(key)
+                    if key not in self.previous:
+                        self.previous[key] = stats
+                    if stats is None:
+                        stats = [price, 0.0, 1, price, None, now]
+                    else:
+                        stats = self.update(stats, price, now, tau, item, key)
+                    self.state[key] = stats
+                    self.dirty[key] = stats
+
+    def update(self, stats, price, now, tau, item, key):
+        """Apply one observation to a series and check it for an anomaly"""
+        ewma, ewvar, points, last_price, last_alerted, updated = stats
+
+        # Compare against the baseline before it absorbs the new point
+        change = (price - ewma) / ewma if ewma else 0.0
+        if (points >= self.min_points and abs(change) >= self.threshold
+                and price != last_alerted and abs(price - ewma) > math.sqrt(ewvar)):
+            self.anomalies.append({
+                "account": key[0],
+                "offer_id": item.get("offer_id", ""),
+                "product_id": item.get("product_id", ""),
+                "field": key[2],
+                "price": price,
+                "baseline": round(ewma, 2),
+                "change_pct": round(change * 100, 1)
+            })
+            last_alerted = price
+
+        # Time-weighted EWMA and variance update
+        alpha = 1 - math.exp(-max(now - updated, 0) / tau) if tau > 0 else 1.0
+        diff = price - ewma
+        ewma += alpha * diff
+        ewvar = (1 - alpha) * (ewvar + alpha * diff * diff)
+        return [ewma, ewvar, points + 1, price, last_alerted, now]
+
+    def commit(self):
+        """Persist updated statistics and return anomalies found in this run"""
+        with self.lock:
+            anomalies, self.anomalies = self.anomalies, []
+            dirty, self.dirty = self.dirty, {}
+            self.previous = {}
+
+        if dirty:
+            with closing(self.connect()) as db, db:
+                db.executemany(
+                    "INSERT OR REPLACE INTO price_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(*key, *stats) for key, stats in dirty.items()]
+                )
+        return anomalies
+
+    def discard(self):
+        """Roll back statistics and anomalies collected in an aborted run"""
+        with self.lock:
+            for key, stats in self.previous.items():
+                if stats is None:
+                    self.state.pop(key, None)
+                else:
+                    self.state[key] = stats
+                self.dirty.pop(key, None)
+            self.previous = {}
+            self.anomalies = []
+
+def format_anomalies(anomalies, price_labels, checked_at=None):
+    """Build an HTML alert for detected anomalies"""
+    checked_at = checked_at or datetime.now()
+    lines = [
+        "<b>📉 Резкие изменения цен</b>",
+        f"<i>Время проверки: {checked_at.strftime('%d.%m.%Y %H:%M:%S')}</i>",
+        ""
+    ]
+    for anomaly in sorted(anomalies, key=lambda a: abs(a["change_pct"]), reverse=True):
+        product_url = f"https://seller.ozon.ru/app/products/card/{anomaly['product_id']}"
+        label = price_labels.get(anomaly["field"], anomaly["field"])
+        lines.append(
+            f"<a href='{product_url}'>{anomaly['offer_id']}</a> - {label}: "
+            f"{anomaly['price']:g} руб. (обычно {anomaly['baseline']:g} руб., {anomaly['change_pct']:+.1f}%)"
+        )
+    return "\n".join(lines)
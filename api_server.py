@@ -0,0 +1,127 @@
+import hmac
+import json
+import logging
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger(__name__)
+
+class StatusApiServer:
+    """Local HTTP API for querying monitor state and triggering checks.
+
+    Handlers only read the in-memory state published by OzonPriceMonitor,
+    so polling never touches the Ozon API or waits for a running check.
+    Requests from browsers (with an Origin header) are rejected, POST
+    requests must be JSON, and when a token is set every request must
+    carry it in the X-Api-Token header.
+    """
+
+    def __init__(self, monitor, host="127.0.0.1", port=8080, on_check=None, on_stop=None, token=""):
+        self.monitor = monitor
+        self.host = host
+        self.port = port
+        self.token = token
+        self.on_check = on_check or self._default_check
+        self.on_stop = on_stop or monitor.stop_monitoring
+        self.httpd = None
+        self.thread = None
+
+    def _default_check(self):
+        """Run a check in a background thread when no GUI is attached"""
+        threading.Thread(target=self.monitor.run_once, daemon=True).start()
+
+    def start(self):
+        """Start serving requests in a background thread"""
+        server = self
+
+        class Handler(StatusRequestHandler):
+            api = server
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        logger.info(f"Status API listening on http://{self.host}:{self.port}")
+        if not self.token and self.host not in ("127.0.0.1", "localhost", "::1"):
+            logger.warning("Status API is reachable from the network without a token")
+
+    def stop(self):
+        """Stop the server"""
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+            logger.info("Status API stopped")
+
+class StatusRequestHandler(BaseHTTPRequestHandler):
+    """Request handler bound to a StatusApiServer via the `api` attribute"""
+    api = None
+
+    def authorize(self):
+        """Reject browser and unauthenticated requests, return True if allowed"""
+        # Any web page can send simple cross-origin requests to localhost
+        if self.headers.get("Origin"):
+            self.send_json(403, {"error": "Cross-origin requests are not allowed"})
+            return False
+        if self.api.token and not hmac.compare_digest(self.headers.get("X-Api-Token", ""), self.api.token):
+            self.send_json(401, {"error": "Missing or invalid X-Api-Token"})
+            return False
+        return True
+
+    def do_GET(self):
+        if not self.authorize():
+            return
+        url = urlparse(self.path)
+        if url.path == "/status":
+            self.send_json(200, self.api.monitor.get_status())
+        elif url.path == "/discrepancies":
+            query = parse_qs(url.query)
+            account = query.get("account", [None])[0]
+            since = query.get("since", [None])[0]
+            if since:
+                try:
+                    since = datetime.fromisoformat(since)
+                except ValueError:
+                    self.send_json(400, {"error": f"Invalid 'since' value: {since}"})
+                    return
+                if since.tzinfo is not None:
+                    # Discrepancies are stamped with naive local time
+                    since = since.astimezone().replace(tzinfo=None)
+            items = self.api.monitor.get_discrepancies(account=account, since=since)
+            self.send_json(200, {"count": len(items), "items": items})
+        else:
+            self.send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if not self.authorize():
+            return
+        # Browsers cannot send this content type cross-origin without a preflight
+        if self.headers.get("Content-Type", "").split(";")[0].strip().lower() != "application/json":
+            self.send_json(415, {"error": "Content-Type must be application/json"})
+            return
+        url = urlparse(self.path)
+        if url.path == "/check":
+            if self.api.monitor.run_in_progress:
+                self.send_json(409, {"status": "busy"})
+                return
+            self.api.on_check()
+            self.send_json(202, {"status": "accepted"})
+        elif url.path == "/stop":
+            self.api.on_stop()
+            self.send_json(200, {"status": "stopped"})
+        else:
+            self.send_json(404, {"error": "Not found"})
+
+    def send_json(self, status, data):
+        """Send a JSON response"""
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"Status API: {format % args}")
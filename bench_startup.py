@@ -0,0 +1,115 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+HISTORY_FILE = "startup_benchmark.jsonl"
+
+# Run in a fresh interpreter: create the main window and report when it is first mapped
+WINDOW_SCRIPT = """
+import time
+started = time.perf_counter()
+from gui import OzonMonitorApp
+app = OzonMonitorApp()
+def on_map(event):
+    if event.widget is app:
+        print(round((time.perf_counter() - started) * 1000, 1), flush=True)
+        app.after(0, app._force_exit)
+app.bind("<Map>", on_map, add="+")
+app.mainloop()
+"""
+
+def measure_imports(module="gui"):
+    """Import a module with -X importtime, return total ms and cumulative ms per module"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    # Nested imports are listed before their parent, keep only the module's own subtree
+    modules = {}
+    subtree = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        subtree[name.strip()] = int(cumulative_us) / 1000
+        if not name.startswith("  "):
+            # Top level import finished
+            if name.strip() == module:
+                modules = subtree
+            subtree = {}
+    return modules.get(module, 0.0), modules
+
+def measure_first_frame():
+    """Return ms from interpreter start to the first map of the main window"""
+    result = subprocess.run(
+        [sys.executable, "-c", WINDOW_SCRIPT],
+        capture_output=True, text=True, timeout=60,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        raise RuntimeError(result.stderr.strip() or "main window was not shown")
+    return float(lines[-1])
+
+def load_previous(path):
+    """Return the last recorded benchmark, or None"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = [line for line in f if line.strip()]
+        return json.loads(lines[-1]) if lines else None
+    except (OSError, ValueError):
+        return None
+
+def format_delta(current, previous):
+    if previous is None:
+        return ""
+    return f" ({current - previous:+.1f} ms)"
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Ozon Price Monitor startup time")
+    parser.add_argument("--runs", type=int, default=5, help="number of measurements, the median is reported")
+    parser.add_argument("--top", type=int, default=10, help="number of slowest imports to show")
+    parser.add_argument("--window", action="store_true", help="also measure time to the first frame")
+    parser.add_argument("--history", default=HISTORY_FILE, help="file the results are appended to")
+    args = parser.parse_args()
+
+    samples = [measure_imports() for _ in range(max(args.runs, 1))]
+    samples.sort(key=lambda sample: sample[0])
+    import_ms, modules = samples[len(samples) // 2]
+
+    entry = {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "import_ms": round(import_ms, 1),
+        "top_imports": dict(sorted(modules.items(), key=lambda item: item[1], reverse=True)[1:args.top + 1])
+    }
+
+    if args.window:
+        if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+            print("DISPLAY is not set, first frame measurement skipped")
+        else:
+            frames = sorted(measure_first_frame() for _ in range(max(args.runs, 1)))
+            entry["first_frame_ms"] = frames[len(frames) // 2]
+
+    previous = load_previous(args.history) or {}
+
+    print(f"import gui: {entry['import_ms']} ms{format_delta(entry['import_ms'], previous.get('import_ms'))}")
+    if "first_frame_ms" in entry:
+        print(f"first frame: {entry['first_frame_ms']} ms"
+              f"{format_delta(entry['first_frame_ms'], previous.get('first_frame_ms'))}")
+    print(f"slowest imports (cumulative):")
+    for name, ms in entry["top_imports"].items():
+        print(f"  {ms:8.1f} ms  {name}")
+
+    with open(args.history, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+if __name__ == "__main__":
+    main()
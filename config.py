@@ -1,5 +1,9 @@
 import json
 import os
+import tempfile
+import threading
+import time
+from types import MappingProxyType
 
 # Default configuration
 DEFAULT_CONFIG = {
@@ -11,6 +15,18 @@ DEFAULT_CONFIG = {
     "telegram_bot_token": "",
     "telegram_channel": "",
 
+    # Additional notification sinks, e.g.
+    # {"type": "telegram", "chat_id": "@other_channel"}
+    # {"type": "webhook", "url": "https://...", "headers": {}, "timeout": 5}
+    # {"type": "file", "path": "notifications.jsonl"}
+    # {"type": "syslog", "address": "/dev/log"}
+    "notification_sinks": [],
+
+    # Digest mode: one summary per window (in minutes) instead of a report per run
+    "digest_enabled": False,
+    "digest_window": 60,
+    "digest_top_n": 10,
+
     # Price monitoring settings
     "check_min_price": True,
     "check_marketing_price": True,
@@ -24,38 +40,201 @@ DEFAULT_CONFIG = {
 
     # Application settings
     "auto_start": False,
-    "log_level": "INFO"
+    "log_level": "INFO",
+
+    # Log file with rotation ("size" or "time" - daily at midnight)
+    "log_file": "price_monitor.log",
+    "log_rotation": "size",
+    "log_max_bytes": 5 * 1024 * 1024,
+    "log_backup_count": 5,
+    "log_json": True,
+
+    # Local status API
+    "api_server_enabled": False,
+    "api_server_host": "127.0.0.1",
+    "api_server_port": 8080,
+    "api_server_token": "",
+
+    # Record Ozon/Telegram API traffic for offline replay
+    "record_api": False,
+    "capture_dir": "captures",
+
+    # Per-run profiling (cProfile + tracemalloc)
+    "profiling_enabled": False,
+    "profile_dir": "profiles",
+    "profile_keep": 20,
+    "profile_top_n": 10,
+
+    # Export of each run to CSV/Parquet files
+    "export_enabled": False,
+    "export_dir": "exports",
+    "export_csv": True,
+    "export_parquet": True,
+    "export_snapshot": False,
+    "export_retention_days": 30,
+
+    # Alerts on sudden price moves against the price history
+    "anomaly_enabled": False,
+    "anomaly_db": "price_history.db",
+    "anomaly_fields": ["marketing_seller_price", "marketing_price"],
+    "anomaly_window_hours": 168,
+    "anomaly_threshold": 30,
+    "anomaly_min_points": 5,
+
+    # Run watchdog: deadlines (seconds) and run time SLO
+    "run_deadline": 600,
+    "fetch_page_deadline": 60,
+    "analyze_deadline": 30,
+    "notify_deadline": 30,
+    "run_slo_seconds": 120,
+
+    # Maximum number of price pages whose analysis is cached between runs
+    "page_cache_size": 1000
 }
 
 CONFIG_FILE = "ozon_monitor_config.json"
 
-def load_config():
-    """Load configuration from file or create default if not exists"""
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                config = json.load(f)
+# Shared read-only snapshot of the configuration and the file state it was read from
+_snapshot = None
+_file_state = None
+_lock = threading.RLock()
+_subscribers = []
+_watcher = None
+
+def freeze(value):
+    """Return a read-only deep copy of a config value"""
+    if isinstance(value, (dict, MappingProxyType)):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+def thaw(value):
+    """Return a mutable deep copy of a config value"""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(v) for v in value]
+    return value
+
+def _read_file_state():
+    """Return (mtime, size) of the config file or None if it does not exist"""
+    try:
+        stat = os.stat(CONFIG_FILE)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
 
-                # Ensure all required keys are present (for backward compatibility)
-                for key, value in DEFAULT_CONFIG.items():
-                    if key not in config:
-                        config[key] = value
+def _with_defaults(config):
+    """Ensure all required keys are present (for backward compatibility)"""
+    config = thaw(config)
+    for key, value in DEFAULT_CONFIG.items():
+        if key not in config:
+            config[key] = thaw(value)
+    return config
 
-                return config
+def subscribe(callback):
+    """Call callback(snapshot) whenever the configuration changes"""
+    with _lock:
+        if callback not in _subscribers:
+            _subscribers.append(callback)
+
+def unsubscribe(callback):
+    """Stop notifying callback about configuration changes"""
+    with _lock:
+        if callback in _subscribers:
+            _subscribers.remove(callback)
+
+def _notify(snapshot):
+    """Push a new snapshot to all subscribers"""
+    with _lock:
+        subscribers = list(_subscribers)
+    for callback in subscribers:
+        try:
+            callback(snapshot)
         except Exception as e:
-            print(f"Error loading config: {e}")
-            return DEFAULT_CONFIG
-    else:
-        # Create default config file
-        save_config(DEFAULT_CONFIG)
-        return DEFAULT_CONFIG
+            print(f"Error applying config: {e}")
+
+def refresh():
+    """Reload configuration if the file changed since it was last read.
+
+    Returns True if a new snapshot was published.
+    """
+    global _snapshot, _file_state
+    with _lock:
+        file_state = _read_file_state()
+        if _snapshot is not None and file_state == _file_state:
+            return False
+
+        if file_state is None:
+            # Create default config file
+            if save_config(DEFAULT_CONFIG):
+                return True
+            snapshot = _snapshot if _snapshot is not None else freeze(DEFAULT_CONFIG)
+        else:
+            try:
+                with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+                    snapshot = freeze(_with_defaults(json.load(f)))
+            except Exception as e:
+                print(f"Error loading config: {e}")
+                # Keep the previous snapshot until the file changes again
+                snapshot = _snapshot if _snapshot is not None else freeze(DEFAULT_CONFIG)
+
+        changed = snapshot is not _snapshot
+        _snapshot = snapshot
+        _file_state = file_state
+
+    if changed:
+        _notify(snapshot)
+    return changed
+
+def get_config():
+    """Return the shared read-only configuration snapshot"""
+    refresh()
+    return _snapshot
+
+def load_config():
+    """Return a mutable copy of the configuration, e.g. for editing"""
+    return thaw(get_config())
 
 def save_config(config):
-    """Save configuration to file"""
+    """Save configuration to file atomically and publish it to subscribers"""
+    global _snapshot, _file_state
     try:
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=4, ensure_ascii=False)
-        return True
+        with _lock:
+            config = _with_defaults(config)
+            directory = os.path.dirname(os.path.abspath(CONFIG_FILE))
+            fd, temp_path = tempfile.mkstemp(prefix=".ozon_monitor_config.", suffix=".tmp", dir=directory)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(config, f, indent=4, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, CONFIG_FILE)
+            except Exception:
+                os.remove(temp_path)
+                raise
+
+            snapshot = freeze(config)
+            _snapshot = snapshot
+            _file_state = _read_file_state()
     except Exception as e:
         print(f"Error saving config: {e}")
         return False
+
+    _notify(snapshot)
+    return True
+
+def start_watcher(interval=2.0):
+    """Poll the config file in a background thread and publish changes"""
+    global _watcher
+
+    def watch():
+        while True:
+            time.sleep(interval)
+            refresh()
+
+    with _lock:
+        if _watcher is None:
+            _watcher = threading.Thread(target=watch, daemon=True)
+            _watcher.start()
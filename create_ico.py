@@ -1,16 +1,35 @@
-from PIL import Image
 import os
 
+# Icon sizes prerendered for the window, the tray and the ICO file
+ICON_SIZES = [(16, 16), (32, 32), (48, 48), (64, 64)]
+
+def cached_icon_path(size, png_path="ozon_monitor_icon.png"):
+    """Path of the prerendered PNG of the given size next to the source icon"""
+    base, ext = os.path.splitext(png_path)
+    return f"{base}_{size[0]}x{size[1]}.png"
+
+def create_icon_cache(png_path="ozon_monitor_icon.png", sizes=ICON_SIZES):
+    """Prerender resized PNG icons so the GUI does not resize at startup"""
+    from PIL import Image
+
+    img = Image.open(png_path)
+    for size in sizes:
+        path = cached_icon_path(size, png_path)
+        img.resize(size, Image.LANCZOS).save(path, optimize=True)
+        print(f"Icon created at: {os.path.abspath(path)}")
+
 def create_ico_from_png(png_path="ozon_monitor_icon.png", ico_path="ozon_monitor_icon.ico"):
     """Convert PNG to ICO file"""
+    from PIL import Image
+
     try:
         img = Image.open(png_path)
 
         # ICO format requires specific sizes, let's create multiple sizes
-        sizes = [(16, 16), (32, 32), (48, 48), (64, 64)]
-        img.save(ico_path, format='ICO', sizes=sizes)
+        img.save(ico_path, format='ICO', sizes=ICON_SIZES)
 
         print(f"ICO file created at: {os.path.abspath(ico_path)}")
+        create_icon_cache(png_path)
     except Exception as e:
         print(f"Error creating ICO file: {str(e)}")
 
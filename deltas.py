@@ -0,0 +1,35 @@
+def discrepancy_key(record):
+    """Return the key a discrepancy is tracked by across runs"""
+    return (record["account"], record["product_id"])
+
+def diff_discrepancies(previous, current):
+    """Compare the discrepancies of two runs.
+
+    Records are matched by (account, product_id). A record present in both
+    runs is reported as changed only if its prices differ, so an unchanged
+    report produces an empty delta regardless of its size.
+    """
+    before = {discrepancy_key(record): record for record in previous}
+    seen = set()
+    new = []
+    changed = []
+    for record in current:
+        key = discrepancy_key(record)
+        seen.add(key)
+        old = before.get(key)
+        if old is None:
+            new.append(record)
+        elif old["prices"] != record["prices"]:
+            changed.append(record)
+    resolved = [record for key, record in before.items() if key not in seen]
+    return {"new": new, "changed": changed, "resolved": resolved}
+
+def delta_summary(delta):
+    """Return the counts of a run delta for status queries and logs"""
+    return {
+        "total": delta["total"],
+        "new": len(delta["new"]),
+        "changed": len(delta["changed"]),
+        "resolved": len(delta["resolved"]),
+        "duration": delta["duration"]
+    }
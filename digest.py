@@ -0,0 +1,120 @@
+import csv
+import io
+from datetime import datetime, timedelta
+
+# Price that every other monitored price is compared against
+BASE_PRICE = "marketing_seller_price"
+
+def discrepancy_rules(prices):
+    """Return the price fields that differ from the seller price"""
+    base = prices.get(BASE_PRICE)
+    if base is None:
+        return [name for name in prices]
+    return [name for name, value in prices.items() if name != BASE_PRICE and value != base]
+
+def discrepancy_delta(prices):
+    """Return the spread between the highest and lowest price"""
+    values = list(prices.values())
+    return max(values) - min(values) if values else 0
+
+class DigestCollector:
+    """Collect discrepancies across runs and summarize them once per window.
+
+    A product seen in several runs of the same window is reported once,
+    with the prices of its latest run and the number of runs it was seen in.
+    """
+
+    def __init__(self, window_minutes=60, top_n=10, price_labels=None):
+        self.window = timedelta(minutes=window_minutes)
+        self.top_n = top_n
+        self.price_labels = price_labels or {}
+        self.entries = {}
+        self.runs = 0
+        self.window_start = None
+
+    def add(self, discrepancies, now=None):
+        """Add discrepancies of one run to the current window"""
+        now = now or datetime.now()
+        if self.window_start is None:
+            self.window_start = now
+        self.runs += 1
+
+        for record in discrepancies:
+            key = (record["account"], record["product_id"])
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = {"first_seen": record["detected_at"], "runs": 0}
+            entry.update(record)
+            entry["runs"] += 1
+            entry["last_seen"] = record["detected_at"]
+            entry["rules"] = discrepancy_rules(record["prices"])
+            entry["delta"] = discrepancy_delta(record["prices"])
+
+    def due(self, now=None):
+        """Whether the window has elapsed and there is something to send"""
+        now = now or datetime.now()
+        return bool(self.entries) and now - self.window_start >= self.window
+
+    def next_flush(self):
+        """Return when the current window ends, or None if it is empty"""
+        return self.window_start + self.window if self.window_start else None
+
+    def flush(self, now=None):
+        """Build the summary and CSV for the window and start a new one.
+
+        Returns (summary_html, csv_bytes, csv_filename).
+        """
+        now = now or datetime.now()
+        entries = sorted(self.entries.values(), key=lambda e: e["delta"], reverse=True)
+        summary = self.build_summary(entries, now)
+        csv_bytes = self.build_csv(entries)
+        filename = now.strftime("price_discrepancies_%Y%m%d_%H%M.csv")
+
+        self.entries = {}
+        self.runs = 0
+        self.window_start = None
+        return summary, csv_bytes, filename
+
+    def build_summary(self, entries, now):
+        """Build a compact HTML summary with counts per rule and top deltas"""
+        rule_counts = {}
+        for entry in entries:
+            for rule in entry["rules"]:
+                rule_counts[rule] = rule_counts.get(rule, 0) + 1
+
+        period = f"{self.window_start.strftime('%d.%m.%Y %H:%M')} - {now.strftime('%d.%m.%Y %H:%M')}"
+        lines = [
+            "<b>📊 Сводка расхождений в ценах товаров</b>",
+            f"<i>Период: {period}, проверок: {self.runs}</i>",
+            "",
+            f"Товаров с расхождениями: <b>{len(entries)}</b>"
+        ]
+        for rule, count in sorted(rule_counts.items(), key=lambda item: item[1], reverse=True):
+            lines.append(f"- {self.price_labels.get(rule, rule)}: {count}")
+
+        lines.append("")
+        lines.append(f"<b>Наибольшие расхождения (топ {min(self.top_n, len(entries))}):</b>")
+        for entry in entries[:self.top_n]:
+            product_url = f"https://seller.ozon.ru/app/products/card/{entry['product_id']}"
+            lines.append(f"<a href='{product_url}'>{entry['offer_id']}</a>: {entry['delta']} руб.")
+
+        lines.append("")
+        lines.append("<i>Полный список - в прикрепленном CSV-файле.</i>")
+        return "\n".join(lines)
+
+    def build_csv(self, entries):
+        """Build a CSV document with all collected discrepancies"""
+        output = io.StringIO()
+        writer = csv.writer(output, delimiter=";")
+        price_fields = list(self.price_labels) or [BASE_PRICE]
+        writer.writerow(["account", "offer_id", "product_id", *price_fields,
+                         "delta", "rules", "first_seen", "last_seen", "runs"])
+        for entry in entries:
+            writer.writerow([
+                entry["account"], entry["offer_id"], entry["product_id"],
+                *[entry["prices"].get(field, "") for field in price_fields],
+                entry["delta"], ",".join(entry["rules"]),
+                entry["first_seen"], entry["last_seen"], entry["runs"]
+            ])
+        # BOM so that Excel detects UTF-8
+        return output.getvalue().encode("utf-8-sig")
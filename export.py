@@ -0,0 +1,212 @@
+import csv
+import glob
+import logging
+import os
+import time
+
+# pyarrow is imported on first use, it is slow to import and optional
+pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+# Price fields exported as columns, in this order
+PRICE_FIELDS = ("marketing_seller_price", "min_price", "marketing_price", "price", "old_price")
+
+DISCREPANCY_COLUMNS = (
+    ("run_id", "string"), ("checked_at", "timestamp"), ("account", "string"),
+    ("offer_id", "string"), ("product_id", "int64"),
+    *[(field, "float64") for field in PRICE_FIELDS[:4]],
+    ("delta", "float64")
+)
+
+SNAPSHOT_COLUMNS = (
+    ("run_id", "string"), ("checked_at", "timestamp"), ("account", "string"),
+    ("offer_id", "string"), ("product_id", "int64"),
+    *[(field, "float64") for field in PRICE_FIELDS],
+    ("currency_code", "string")
+)
+
+def to_float(value):
+    """Convert an API price (number or string) to float, None if missing"""
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+def to_int(value):
+    """Convert an API identifier to int, None if missing"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def load_pyarrow():
+    """Import pyarrow on first use, return False if it is not installed"""
+    global pa, pq
+    if pq is None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            return False
+        pa, pq = pyarrow, pyarrow.parquet
+    return True
+
+def parquet_available():
+    """Whether pyarrow is installed"""
+    return load_pyarrow()
+
+def arrow_schema(columns):
+    """Build a pyarrow schema with fixed column types"""
+    types = {
+        "string": pa.string(),
+        "int64": pa.int64(),
+        "float64": pa.float64(),
+        "timestamp": pa.timestamp("s")
+    }
+    return pa.schema([(name, types[dtype]) for name, dtype in columns])
+
+class CsvTableWriter:
+    """Append rows to a CSV file"""
+
+    def __init__(self, path, columns):
+        self.file = open(path, "w", encoding="utf-8", newline="")
+        self.columns = [name for name, dtype in columns]
+        self.writer = csv.DictWriter(self.file, fieldnames=self.columns, delimiter=";")
+        self.writer.writeheader()
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class ParquetTableWriter:
+    """Append rows to a Parquet file, one row group per page"""
+
+    def __init__(self, path, columns):
+        self.schema = arrow_schema(columns)
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def write(self, rows):
+        if rows:
+            self.writer.write_table(pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+class RunExporter:
+    """Stream the discrepancies (and optionally all prices) of one run to files.
+
+    Rows are written page by page, so the full report is never kept in
+    memory. Files are written with a .part suffix and renamed when the run
+    completes, so readers never see a partial export.
+    """
+
+    def __init__(self, export_dir, run_id, checked_at, account, csv_enabled=True,
+                 parquet_enabled=True, include_snapshot=False):
+        self.run_id = run_id
+        self.checked_at = checked_at.replace(microsecond=0)
+        self.account = account
+        self.writers = []
+
+        os.makedirs(export_dir, exist_ok=True)
+        stamp = checked_at.strftime("%Y%m%d_%H%M%S")
+        tables = [("discrepancies", DISCREPANCY_COLUMNS)]
+        if include_snapshot:
+            tables.append(("snapshot", SNAPSHOT_COLUMNS))
+
+        if parquet_enabled and not parquet_available():
+            logger.warning("pyarrow is not installed, Parquet export skipped")
+            parquet_enabled = False
+
+        for table, columns in tables:
+            # run_id keeps files of runs started within the same second apart
+            path = os.path.join(export_dir, f"{table}_{stamp}_{run_id}")
+            if csv_enabled:
+                self.add_writer(table, f"{path}.csv", CsvTableWriter, columns)
+            if parquet_enabled:
+                self.add_writer(table, f"{path}.parquet", ParquetTableWriter, columns)
+
+    def add_writer(self, table, path, writer_class, columns):
+        """Open a writer for a table in a temporary file"""
+        self.writers.append((table, path, writer_class(f"{path}.part", columns)))
+
+    def write_page(self, items, discrepancies):
+        """Write one page of price items and the discrepancies found on it"""
+        tables = {"discrepancies": [self.discrepancy_row(record) for record in discrepancies]}
+        if any(table == "snapshot" for table, path, writer in self.writers):
+            tables["snapshot"] = [self.snapshot_row(item) for item in items]
+
+        for table, path, writer in self.writers:
+            writer.write(tables[table])
+
+    def discrepancy_row(self, record):
+        """Convert a discrepancy record to an export row"""
+        prices = record["prices"]
+        row = {
+            "run_id": self.run_id,
+            "checked_at": self.checked_at,
+            "account": self.account,
+            "offer_id": str(record["offer_id"]),
+            "product_id": to_int(record["product_id"])
+        }
+        values = []
+        for field in PRICE_FIELDS[:4]:
+            row[field] = to_float(prices.get(field))
+            if row[field] is not None:
+                values.append(row[field])
+        row["delta"] = max(values) - min(values) if values else None
+        return row
+
+    def snapshot_row(self, item):
+        """Convert a price item from the API to an export row"""
+        price_data = item.get("price", {})
+        row = {
+            "run_id": self.run_id,
+            "checked_at": self.checked_at,
+            "account": self.account,
+            "offer_id": str(item.get("offer_id", "")),
+            "product_id": to_int(item.get("product_id"))
+        }
+        for field in PRICE_FIELDS:
+            row[field] = to_float(price_data.get(field))
+        row["currency_code"] = price_data.get("currency_code")
+        return row
+
+    def close(self):
+        """Finish the export and return the paths of the written files"""
+        paths = []
+        for table, path, writer in self.writers:
+            writer.close()
+            os.replace(f"{path}.part", path)
+            paths.append(path)
+        self.writers = []
+        return paths
+
+    def abort(self):
+        """Discard a partial export"""
+        for table, path, writer in self.writers:
+            try:
+                writer.close()
+                os.remove(f"{path}.part")
+            except Exception as e:
+                logger.error(f"Error removing partial export {path}: {str(e)}")
+        self.writers = []
+
+def cleanup_exports(export_dir, retention_days):
+    """Delete exported files older than retention_days"""
+    if retention_days <= 0:
+        return 0
+    cutoff = time.time() - retention_days * 86400
+    removed = 0
+    for pattern in ("discrepancies_*", "snapshot_*"):
+        for path in glob.glob(os.path.join(export_dir, pattern)):
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+    return removed
@@ -3,15 +3,24 @@ from tkinter import ttk, messagebox, scrolledtext
 import threading
 import time
 from datetime import datetime, timedelta
-import requests
 import os
+import signal
 import sys
-import pystray
-from PIL import Image, ImageDraw
 
-from settings_dialog import SettingsDialog
-from ozon_price_monitor import OzonPriceMonitor
+from ozon_price_monitor import OzonPriceMonitor, PRICE_LABELS
+from create_ico import cached_icon_path
 import config
+import logging_setup
+
+def resource_path(filename):
+    """Return the path of a bundled resource file"""
+    if getattr(sys, 'frozen', False):
+        # If the application is run as a bundle (pyinstaller)
+        base_path = sys._MEIPASS
+    else:
+        # If running in a normal Python environment
+        base_path = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_path, filename)
 
 class OzonMonitorApp(tk.Tk):
     def __init__(self):
@@ -25,12 +34,20 @@ class OzonMonitorApp(tk.Tk):
         # Set application icon
         self.set_app_icon()
 
-        # Load config
-        self.app_config = config.load_config()
-
         # Create monitor instance
         self.monitor = OzonPriceMonitor()
-        self.monitor.set_update_callback(self.update_status)
+        # Callbacks come from worker threads, Tk is only touched from the main loop
+        self.monitor.set_update_callback(lambda: self.after(0, self.update_status))
+        self.monitor.set_delta_callback(lambda delta: self.after(0, self.apply_delta, delta))
+
+        # Discrepancies shown in the results pane, one line per product
+        self.discrepancy_count = 0
+        self.delta_text = ""
+        self.result_marks = set()
+
+        # Shared config snapshot, kept current by the config watcher; the
+        # monitor has just loaded it, so it is not read from disk again
+        self.app_config = self.monitor.config_source
 
         # Timer variables
         self.timer_thread = None
@@ -40,12 +57,33 @@ class OzonMonitorApp(tk.Tk):
         self.create_menu()
         self.create_main_frame()
 
-        # Setup system tray icon
-        self.setup_tray_icon()
+        self.tray_icon = None
+        self.tray_badge_count = None
+        self.api_server = None
+        self.api_server_settings = None
 
         # Handle window close event
         self.protocol("WM_DELETE_WINDOW", self.on_close)
 
+        # Everything not needed for the first frame is started once the window is shown
+        self.after_idle(self.deferred_init)
+
+    def deferred_init(self):
+        """Start background services after the main window is drawn"""
+        # Setup system tray icon
+        self.setup_tray_icon()
+
+        # Start local status API if enabled
+        self.setup_api_server()
+
+        # Apply config changes from the settings dialog or the file on disk
+        config.subscribe(lambda new_config: self.after(0, self.reload_config))
+        config.start_watcher()
+
+        # Toggle profiling with SIGUSR1 where available
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.monitor.toggle_profiling())
+
         # Check for auto-start
         if self.app_config["auto_start"]:
             self.after(1000, self.start_monitoring)
@@ -53,21 +91,16 @@ class OzonMonitorApp(tk.Tk):
     def set_app_icon(self):
         """Set application icon for window and taskbar"""
         try:
-            # Determine the base path for the icon
-            if getattr(sys, 'frozen', False):
-                # If the application is run as a bundle (pyinstaller)
-                base_path = sys._MEIPASS
-            else:
-                # If running in a normal Python environment
-                base_path = os.path.dirname(os.path.abspath(__file__))
-
             # Choose icon based on platform
             if sys.platform.startswith('win'):
-                icon_path = os.path.join(base_path, "ozon_monitor_icon.ico")
+                icon_path = resource_path("ozon_monitor_icon.ico")
                 if os.path.exists(icon_path):
                     self.iconbitmap(icon_path)
             else:
-                icon_path = os.path.join(base_path, "ozon_monitor_icon.png")
+                # Prefer the prerendered small icon, decoding the full size PNG is slow
+                icon_path = resource_path(cached_icon_path((64, 64)))
+                if not os.path.exists(icon_path):
+                    icon_path = resource_path("ozon_monitor_icon.png")
                 if os.path.exists(icon_path):
                     icon = tk.PhotoImage(file=icon_path)
                     self.iconphoto(True, icon)
@@ -78,19 +111,25 @@ class OzonMonitorApp(tk.Tk):
 
     def create_tray_icon_image(self, size=(64, 64)):
         """Create a proper tray icon image that works well in KDE"""
-        try:
-            # Determine icon path
-            if getattr(sys, 'frozen', False):
-                base_path = sys._MEIPASS
-            else:
-                base_path = os.path.dirname(os.path.abspath(__file__))
+        from PIL import Image, ImageDraw
 
-            icon_path = os.path.join(base_path, "ozon_monitor_icon.png")
+        try:
+            icon_path = resource_path("ozon_monitor_icon.png")
+            cache_path = resource_path(cached_icon_path(size))
 
-            if os.path.exists(icon_path):
+            if os.path.exists(cache_path):
+                # Prerendered by create_ico.py, no resize needed
+                image = Image.open(cache_path)
+                image.load()
+                return image
+            elif os.path.exists(icon_path):
                 # Open and resize the image to ensure it displays correctly
                 image = Image.open(icon_path)
                 image = image.resize(size, Image.LANCZOS)
+                try:
+                    image.save(cache_path)
+                except OSError:
+                    pass
 
                 # For KDE, sometimes a simple image works better
                 return image
@@ -110,11 +149,14 @@ class OzonMonitorApp(tk.Tk):
     def setup_tray_icon(self):
         """Setup system tray icon"""
         try:
+            import pystray
+
             # Create tray icon with a properly sized image
             self.tray_icon_image = self.create_tray_icon_image()
             self.tray_icon = pystray.Icon("ozon_monitor")
             self.tray_icon.icon = self.tray_icon_image
             self.tray_icon.title = "Ozon Price Monitor"
+            self.update_tray_icon()
 
             # Create tray menu with simpler structure for better KDE compatibility
             self.tray_icon.menu = pystray.Menu(
@@ -129,6 +171,50 @@ class OzonMonitorApp(tk.Tk):
         except Exception as e:
             print(f"Error setting up tray icon: {str(e)}")
 
+    def render_tray_badge(self, image, count):
+        """Draw the discrepancy count in a badge over the tray icon"""
+        from PIL import ImageDraw, ImageFont
+
+        badge = image.convert("RGBA")
+        width, height = badge.size
+        text = str(count) if count < 100 else "99+"
+        diameter = int(min(width, height) * (0.55 if len(text) < 3 else 0.7))
+        box = (width - diameter, height - diameter, width - 1, height - 1)
+
+        try:
+            font = ImageFont.load_default(size=int(diameter * 0.65))
+        except TypeError:
+            # Pillow older than 10.1 has only the fixed size bitmap font
+            font = ImageFont.load_default()
+
+        draw = ImageDraw.Draw(badge)
+        draw.ellipse(box, fill=(220, 38, 38), outline=(255, 255, 255))
+        center = ((box[0] + box[2]) / 2, (box[1] + box[3]) / 2)
+        try:
+            draw.text(center, text, fill=(255, 255, 255), font=font, anchor="mm")
+        except (TypeError, ValueError):
+            # anchor is not supported for bitmap fonts
+            text_width, text_height = draw.textsize(text, font=font)
+            draw.text((center[0] - text_width / 2, center[1] - text_height / 2), text,
+                      fill=(255, 255, 255), font=font)
+        return badge
+
+    def update_tray_icon(self):
+        """Show the current discrepancy count on the tray icon and in its tooltip"""
+        if not self.tray_icon or self.tray_badge_count == self.discrepancy_count:
+            return
+        self.tray_badge_count = self.discrepancy_count
+
+        try:
+            if self.discrepancy_count:
+                self.tray_icon.icon = self.render_tray_badge(self.tray_icon_image, self.discrepancy_count)
+                self.tray_icon.title = f"Ozon Price Monitor - расхождений: {self.discrepancy_count}"
+            else:
+                self.tray_icon.icon = self.tray_icon_image
+                self.tray_icon.title = "Ozon Price Monitor"
+        except Exception as e:
+            print(f"Error updating tray icon: {str(e)}")
+
     def run_tray_icon(self):
         """Run the tray icon with error handling"""
         try:
@@ -136,6 +222,38 @@ class OzonMonitorApp(tk.Tk):
         except Exception as e:
             print(f"Error running tray icon: {str(e)}")
 
+    def setup_api_server(self):
+        """Start or restart the local status API according to config"""
+        settings = (self.app_config["api_server_enabled"],
+                    self.app_config["api_server_host"],
+                    self.app_config["api_server_port"],
+                    self.app_config["api_server_token"])
+        if settings == self.api_server_settings:
+            return
+        self.api_server_settings = settings
+
+        if self.api_server:
+            self.api_server.stop()
+            self.api_server = None
+
+        if not self.app_config["api_server_enabled"]:
+            return
+
+        try:
+            from api_server import StatusApiServer
+            self.api_server = StatusApiServer(
+                self.monitor,
+                host=self.app_config["api_server_host"],
+                port=int(self.app_config["api_server_port"]),
+                on_check=lambda: self.after(0, self.run_once),
+                on_stop=lambda: self.after(0, self.stop_monitoring),
+                token=self.app_config["api_server_token"]
+            )
+            self.api_server.start()
+        except Exception as e:
+            self.api_server = None
+            print(f"Error starting status API: {str(e)}")
+
     def create_menu(self):
         """Create application menu"""
         menubar = tk.Menu(self)
@@ -196,6 +314,10 @@ class OzonMonitorApp(tk.Tk):
         self.results_text = scrolledtext.ScrolledText(results_frame, wrap=tk.WORD, height=10)
         self.results_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         self.results_text.insert(tk.END, "Мониторинг не запущен")
+        # Status text ends here, product lines follow
+        self.results_text.mark_set("header_end", "end-1c")
+        self.results_text.mark_gravity("header_end", tk.LEFT)
+        self.results_text.tag_configure("changed", background="#fff3c4")
         self.results_text.config(state=tk.DISABLED)
 
         # Status bar
@@ -205,12 +327,17 @@ class OzonMonitorApp(tk.Tk):
 
     def open_settings(self):
         """Open settings dialog"""
+        from settings_dialog import SettingsDialog
         SettingsDialog(self, callback=self.reload_config)
 
     def reload_config(self):
         """Reload configuration"""
-        self.app_config = config.load_config()
-        self.monitor.update_config()
+        new_config = config.get_config()
+        if new_config is self.app_config:
+            return
+        # The monitor picks up the new config when its next run starts
+        self.app_config = new_config
+        self.setup_api_server()
         self.status_var.set("Настройки обновлены")
 
     def show_about(self):
@@ -256,13 +383,18 @@ class OzonMonitorApp(tk.Tk):
         self.status_var.set("Мониторинг остановлен")
         self.timer_status_var.set("Таймер не запущен")
 
-        # Stop monitor
-        self.monitor.running = False
+        # Stop monitor, this also sends the collected digest
+        self.monitor.stop_monitoring()
 
         # Thread will terminate on next iteration
 
     def run_once(self):
         """Run monitoring once"""
+        # Never start a run while the previous one is still going
+        if self.monitor.run_in_progress:
+            self.status_var.set("Предыдущая проверка еще выполняется")
+            return
+
         # Disable buttons during check
         self.start_button.config(state=tk.DISABLED)
         self.run_once_button.config(state=tk.DISABLED)
@@ -279,18 +411,24 @@ class OzonMonitorApp(tk.Tk):
             # Re-enable buttons
             self.after(0, lambda: self.start_button.config(state=tk.NORMAL))
             self.after(0, lambda: self.run_once_button.config(state=tk.NORMAL))
-            self.after(0, lambda: self.status_var.set("Проверка завершена"))
+            stats = self.monitor.watchdog.stats()
+            status_text = "Проверка завершена"
+            if stats["last_duration"] is not None:
+                status_text += f" за {stats['last_duration']:.1f} с (p95: {stats['p95']:.1f} с)"
+            self.after(0, lambda: self.status_var.set(status_text))
 
     def timer_worker(self):
         """Timer worker thread function"""
-        interval_minutes = self.app_config["timer_interval"]
-
         while self.monitor.running:
-            # Calculate next run time
-            self.next_run_time = datetime.now() + timedelta(minutes=interval_minutes)
+            cycle_start = datetime.now()
 
             # Wait until next run time or until stopped
-            while datetime.now() < self.next_run_time and self.monitor.running:
+            while self.monitor.running:
+                # Calculate next run time, following interval changes in config
+                self.next_run_time = cycle_start + timedelta(minutes=self.app_config["timer_interval"])
+                if datetime.now() >= self.next_run_time:
+                    break
+
                 # Update timer status
                 remaining = self.next_run_time - datetime.now()
                 remaining_str = str(timedelta(seconds=int(remaining.total_seconds())))
@@ -306,12 +444,84 @@ class OzonMonitorApp(tk.Tk):
 
     def update_status(self):
         """Update status display with latest results"""
-        # Update results text
         self.results_text.config(state=tk.NORMAL)
-        self.results_text.delete(1.0, tk.END)
-        self.results_text.insert(tk.END, self.monitor.last_result)
+        self.set_results_header()
         self.results_text.config(state=tk.DISABLED)
 
+    def set_results_header(self):
+        """Replace the status text above the product lines"""
+        header = self.monitor.last_result
+        if self.discrepancy_count:
+            header += f"\n\n{self.delta_text}\n\n"
+
+        # Insert the new text first and then delete the old one, so that
+        # the marks of the product lines keep their positions
+        self.results_text.mark_set("header_start", "1.0")
+        self.results_text.mark_gravity("header_start", tk.RIGHT)
+        self.results_text.insert("1.0", header)
+        self.results_text.delete("header_start", "header_end")
+
+    def format_discrepancy(self, record):
+        """Return the results pane line of a discrepancy"""
+        prices = ", ".join(f"{PRICE_LABELS.get(name, name)}: {value} руб."
+                           for name, value in record["prices"].items())
+        return f"{record['offer_id']} (ID: {record['product_id']}) - {prices}\n"
+
+    def replace_result_line(self, mark, record):
+        """Rewrite the product line starting at mark"""
+        # Insert the new line first and then delete the old one: deleting
+        # first would collapse the left-gravity mark of the next product
+        # onto this one and the insert would leave it in front of this line
+        self.results_text.insert(mark, self.format_discrepancy(record), "changed")
+        self.results_text.delete(f"{mark} +1 lines", f"{mark} +2 lines")
+
+    def apply_delta(self, delta):
+        """Apply the changes found by a run to the results pane and the tray icon.
+
+        Only lines of new, changed and resolved products are touched, each
+        product line starts at a mark named after its (account, product_id).
+        """
+        self.discrepancy_count = delta["total"]
+        self.delta_text = (
+            f"Товаров с расхождениями: {delta['total']} (новых: {len(delta['new'])}, "
+            f"изменилось: {len(delta['changed'])}, исправлено: {len(delta['resolved'])}); "
+            f"проверка заняла {delta['duration']:.1f} с"
+        )
+
+        text = self.results_text
+        text.config(state=tk.NORMAL)
+        self.set_results_header()
+        text.tag_remove("changed", "1.0", tk.END)
+
+        for record in delta["resolved"]:
+            mark = f"sku:{record['account']}:{record['product_id']}"
+            if mark in self.result_marks:
+                text.delete(mark, f"{mark} +1 lines")
+                text.mark_unset(mark)
+                self.result_marks.discard(mark)
+
+        added = list(delta["new"])
+        for record in delta["changed"]:
+            mark = f"sku:{record['account']}:{record['product_id']}"
+            if mark in self.result_marks:
+                self.replace_result_line(mark, record)
+            else:
+                added.append(record)
+
+        for record in added:
+            mark = f"sku:{record['account']}:{record['product_id']}"
+            if mark in self.result_marks:
+                self.replace_result_line(mark, record)
+                continue
+            start = text.index("end-1c")
+            text.insert(tk.END, self.format_discrepancy(record), "changed")
+            text.mark_set(mark, start)
+            text.mark_gravity(mark, tk.LEFT)
+            self.result_marks.add(mark)
+
+        text.config(state=tk.DISABLED)
+        self.update_tray_icon()
+
     def show_window_from_tray(self, icon=None, item=None):
         """Show the window from tray with extra steps for KDE"""
         # For KDE, we need to ensure the window is properly shown
@@ -363,6 +573,10 @@ class OzonMonitorApp(tk.Tk):
             if self.monitor.running:
                 self.stop_monitoring()
 
+            # Stop status API
+            if self.api_server:
+                self.api_server.stop()
+
             # Stop tray icon
             if hasattr(self, 'tray_icon') and self.tray_icon:
                 try:
@@ -371,6 +585,12 @@ class OzonMonitorApp(tk.Tk):
                 except Exception as e:
                     print(f"Error stopping tray icon: {str(e)}")
 
+            # Send the digest and queued notifications before threads are killed
+            self.monitor.shutdown()
+
+            # Write out queued log records, os._exit skips atexit handlers
+            logging_setup.shutdown_logging()
+
             # Destroy main window
             self.destroy()
 
@@ -378,6 +598,7 @@ class OzonMonitorApp(tk.Tk):
             self.after(100, self._force_exit)
         except Exception as e:
             print(f"Error during application exit: {str(e)}")
+            logging_setup.shutdown_logging()
             # Force exit as a last resort
             self._force_exit()
 
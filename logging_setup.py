@@ -0,0 +1,121 @@
+import atexit
+import contextvars
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+from datetime import datetime
+
+# Identifier of the monitoring run that the current thread is executing
+current_run_id = contextvars.ContextVar("run_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed via `extra`
+STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "run_id"}
+
+_listener = None
+_queue_handler = None
+
+def set_run_id(run_id):
+    """Tag log records of the current thread with run_id"""
+    current_run_id.set(run_id)
+
+class RunIdFilter(logging.Filter):
+    """Attach the current run ID to records in the logging thread"""
+
+    def filter(self, record):
+        record.run_id = current_run_id.get()
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "run_id": getattr(record, "run_id", None),
+            "message": record.getMessage()
+        }
+        # Structured fields such as timings passed via `extra`
+        for key, value in vars(record).items():
+            if key not in STANDARD_ATTRS:
+                entry[key] = value
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def gzip_namer(name):
+    """Name rotated log files with a .gz suffix"""
+    return name + ".gz"
+
+def gzip_rotator(source, dest):
+    """Compress the rotated log file"""
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+def create_file_handler(config):
+    """Create a rotating file handler according to config"""
+    if config["log_rotation"] == "time":
+        handler = logging.handlers.TimedRotatingFileHandler(
+            config["log_file"], when="midnight", backupCount=config["log_backup_count"], encoding="utf-8")
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            config["log_file"], maxBytes=config["log_max_bytes"],
+            backupCount=config["log_backup_count"], encoding="utf-8")
+    handler.namer = gzip_namer
+    handler.rotator = gzip_rotator
+
+    if config["log_json"]:
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    return handler
+
+def configure_logging(config):
+    """Route logging through a queue to a background listener thread.
+
+    Callers only enqueue records; formatting, file writes and rotation
+    happen in the listener. Calling this again only updates the level.
+    """
+    global _listener, _queue_handler
+
+    level = logging.getLevelName(str(config["log_level"]).upper())
+    if not isinstance(level, int):
+        level = logging.INFO
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    if _listener:
+        return
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    handlers = [console_handler]
+    try:
+        handlers.append(create_file_handler(config))
+    except Exception as e:
+        print(f"Error opening log file: {e}")
+
+    log_queue = queue.SimpleQueue()
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    _queue_handler.addFilter(RunIdFilter())
+    root.addHandler(_queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging():
+    """Flush queued records and stop the listener"""
+    global _listener, _queue_handler
+    if _listener:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener = None
+        _queue_handler = None
@@ -0,0 +1,264 @@
+import json
+import logging
+import logging.handlers
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Events waiting for one sink before new ones are dropped
+MAX_PENDING_PER_SINK = 100
+
+class Notification:
+    """A discrepancy report, digest or error message delivered to all sinks"""
+
+    def __init__(self, text, kind="report", discrepancies=(), document=None):
+        self.text = text
+        self.kind = kind
+        self.discrepancies = list(discrepancies)
+        self.document = document  # (filename, bytes) or None
+        self.created = datetime.now().isoformat(timespec="seconds")
+
+    def plain_text(self):
+        """Return the text without HTML markup"""
+        return re.sub(r"<[^>]+>", "", self.text)
+
+    def to_dict(self):
+        """Return a JSON-serializable representation"""
+        data = {
+            "time": self.created,
+            "kind": self.kind,
+            "text": self.plain_text(),
+            "discrepancies": self.discrepancies
+        }
+        if self.document:
+            filename, content = self.document
+            data["document"] = {"filename": filename, "content": content.decode("utf-8-sig")}
+        return data
+
+class NotificationSink(ABC):
+    """Base class for notification destinations"""
+    type = None
+
+    def __init__(self, name=None, timeout=10):
+        self.name = name or self.type
+        self.timeout = timeout
+
+    @abstractmethod
+    def send(self, notification):
+        """Deliver a notification; raise on failure"""
+
+    def close(self):
+        """Release resources held by the sink"""
+
+class TelegramSink(NotificationSink):
+    """Send notifications to a Telegram chat or channel"""
+    type = "telegram"
+
+    def __init__(self, bot_token, chat_id, post, name=None, timeout=10):
+        super().__init__(name or f"telegram:{chat_id}", timeout)
+        self.bot_token = bot_token
+        self.chat_id = chat_id
+        self.post = post
+
+    def send(self, notification):
+        self.send_message(notification.text)
+        if notification.document:
+            self.send_document(*notification.document)
+
+    def send_message(self, message):
+        """Send a message, splitting it if it is too long"""
+        telegram_api_url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
+        for i, part in enumerate(split_long_message(message)):
+            if i:
+                time.sleep(1)  # Avoid hitting rate limits
+            payload = {
+                "chat_id": self.chat_id,
+                "text": part,
+                "parse_mode": "HTML"
+            }
+            response = self.post(telegram_api_url, json=payload, timeout=self.timeout)
+            if response.status_code != 200:
+                raise RuntimeError(f"Failed to send Telegram message: {response.text}")
+
+    def send_document(self, filename, content, caption="Полный список расхождений"):
+        """Send a file"""
+        telegram_api_url = f"https://api.telegram.org/bot{self.bot_token}/sendDocument"
+        data = {
+            "chat_id": self.chat_id,
+            "caption": caption
+        }
+        response = self.post(telegram_api_url, data=data, files={"document": (filename, content)},
+                             timeout=self.timeout)
+        if response.status_code != 200:
+            raise RuntimeError(f"Failed to send Telegram document: {response.text}")
+
+class WebhookSink(NotificationSink):
+    """POST notifications as JSON to an HTTP endpoint"""
+    type = "webhook"
+
+    def __init__(self, url, post, headers=None, name=None, timeout=5):
+        # Name from the host only, the URL may carry a token
+        super().__init__(name or f"webhook:{urlsplit(url).hostname}", timeout)
+        self.url = url
+        self.headers = headers or {}
+        self.post = post
+
+    def send(self, notification):
+        response = self.post(self.url, json=notification.to_dict(), headers=self.headers, timeout=self.timeout)
+        if response.status_code >= 300:
+            raise RuntimeError(f"Webhook returned {response.status_code}: {response.text[:200]}")
+
+class FileSink(NotificationSink):
+    """Append notifications as JSON lines to a local file"""
+    type = "file"
+
+    def __init__(self, path="notifications.jsonl", name=None):
+        super().__init__(name or f"file:{path}", None)
+        self.path = path
+
+    def send(self, notification):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(notification.to_dict(), ensure_ascii=False) + "\n")
+
+class SyslogSink(NotificationSink):
+    """Send notifications to syslog"""
+    type = "syslog"
+
+    def __init__(self, address=None, name=None, timeout=5):
+        super().__init__(name or "syslog", timeout)
+        if address is None:
+            address = "/dev/log" if os.path.exists("/dev/log") else ("localhost", 514)
+        elif isinstance(address, (list, tuple)):
+            address = tuple(address)
+        self.handler = logging.handlers.SysLogHandler(address=address)
+        if self.handler.socket:
+            self.handler.socket.settimeout(timeout)
+        self.handler.setFormatter(logging.Formatter("ozon_price_monitor: %(message)s"))
+
+    def send(self, notification):
+        level = logging.ERROR if notification.kind == "error" else logging.WARNING
+        for line in notification.plain_text().splitlines():
+            if line.strip():
+                record = logging.LogRecord("notifications", level, __file__, 0, line, None, None)
+                self.handler.emit(record)
+
+    def close(self):
+        self.handler.close()
+
+def split_long_message(message, max_length=4000):
+    """Split a long message into smaller chunks"""
+    parts = []
+    while len(message) > max_length:
+        # Find a good splitting point (newline)
+        split_point = message[:max_length].rfind('\n')
+        if split_point <= 0:  # No newline found, force split
+            split_point = max_length
+        parts.append(message[:split_point])
+        message = message[split_point:]
+    parts.append(message)
+    return parts
+
+def create_sinks(config, post):
+    """Create sinks from config: the main Telegram channel plus notification_sinks"""
+    sinks = []
+    if config["telegram_bot_token"] and config["telegram_channel"]:
+        sinks.append(TelegramSink(config["telegram_bot_token"], config["telegram_channel"], post))
+
+    for definition in config["notification_sinks"]:
+        options = dict(definition)
+        sink_type = options.pop("type", None)
+        try:
+            if sink_type == "telegram":
+                options.setdefault("bot_token", config["telegram_bot_token"])
+                sinks.append(TelegramSink(post=post, **options))
+            elif sink_type == "webhook":
+                sinks.append(WebhookSink(post=post, **options))
+            elif sink_type == "file":
+                sinks.append(FileSink(**options))
+            elif sink_type == "syslog":
+                sinks.append(SyslogSink(**options))
+            else:
+                logger.error(f"Unknown notification sink type: {sink_type}")
+        except Exception as e:
+            logger.error(f"Error creating notification sink {definition}: {str(e)}")
+    return sinks
+
+class NotificationDispatcher:
+    """Deliver notifications to all sinks concurrently.
+
+    Each sink has its own worker thread, so a slow or failing sink never
+    delays the others or the caller; deliveries to one sink keep their order.
+    A delivery still running after `deadline` seconds is reported once
+    through on_stall(sink_name, elapsed).
+    """
+
+    def __init__(self, sinks, deadline=None, on_stall=None):
+        self.sinks = sinks
+        self.deadline = deadline
+        self.on_stall = on_stall
+        self.executors = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"notify-{sink.type}")
+            for sink in sinks
+        ]
+        self.pending = [0] * len(sinks)
+        self.lock = threading.Lock()
+
+    def dispatch(self, notification):
+        """Queue a notification for every sink and return immediately"""
+        for index, sink in enumerate(self.sinks):
+            with self.lock:
+                if self.pending[index] >= MAX_PENDING_PER_SINK:
+                    logger.error(f"Notification sink {sink.name} is backlogged, dropping {notification.kind}")
+                    continue
+                self.pending[index] += 1
+            self.executors[index].submit(self._deliver, index, notification)
+        return len(self.sinks)
+
+    def _deliver(self, index, notification):
+        """Send to one sink, isolating its failures"""
+        sink = self.sinks[index]
+        started = time.perf_counter()
+        timer = None
+        # Stall reports are not watched themselves, so they cannot cascade
+        if self.deadline and self.on_stall and notification.kind != "stall":
+            timer = threading.Timer(self.deadline, self._report_stall, args=(sink, started))
+            timer.daemon = True
+            timer.start()
+        try:
+            sink.send(notification)
+            logger.info(f"Notification sent to {sink.name}", extra={
+                "sink": sink.name,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1)
+            })
+        except Exception as e:
+            logger.error(f"Error sending notification to {sink.name}: {str(e)}")
+        finally:
+            if timer:
+                timer.cancel()
+            with self.lock:
+                self.pending[index] -= 1
+
+    def _report_stall(self, sink, started):
+        """Report a delivery that exceeded the deadline"""
+        elapsed = time.perf_counter() - started
+        logger.warning(f"Notification to {sink.name} is taking {elapsed:.1f} s",
+                       extra={"sink": sink.name, "elapsed_s": round(elapsed, 1)})
+        try:
+            self.on_stall(sink.name, elapsed)
+        except Exception as e:
+            logger.error(f"Error reporting notification stall: {str(e)}")
+
+    def close(self, wait=False):
+        """Stop the workers after queued notifications are delivered"""
+        for sink, executor in zip(self.sinks, self.executors):
+            executor.submit(sink.close)
+            executor.shutdown(wait=wait)
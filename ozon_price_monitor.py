@@ -1,89 +1,281 @@
-import requests
+import hashlib
 import json
 import logging
+import threading
 import time
+import uuid
+from collections import deque
 from datetime import datetime
 import config
+from recorder import ApiRecorder, new_capture_path
+from profiler import RunProfiler
+from page_cache import PageAnalysisCache
+from digest import DigestCollector
+from anomaly import PriceAnomalyDetector, format_anomalies
+from export import RunExporter, cleanup_exports, parquet_available
+from notifications import Notification, NotificationDispatcher, create_sinks
+from run_watchdog import RunWatchdog, RunCancelled
+from deltas import diff_discrepancies, delta_summary
+import logging_setup
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("price_monitor.log"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
+OZON_PRICES_URL = "https://api-seller.ozon.ru/v5/product/info/prices"
+
+# Items per request, the maximum allowed by the prices endpoint
+PAGE_LIMIT = 1000
+
+# Price fields compared by the monitor and their labels in reports
+PRICE_LABELS = {
+    "marketing_seller_price": "Цена (marketing_seller_price)",
+    "min_price": "Минимальная цена (min_price)",
+    "marketing_price": "Цена Озон (marketing_price)",
+    "price": "Цена Озон 2 (price)"
+}
+
+# How many discrepancy records are kept in memory for status queries
+DISCREPANCY_HISTORY_SIZE = 5000
+
+# Config keys of components that are expensive to recreate
+RECORDER_KEYS = ("record_api", "capture_dir")
+NOTIFICATION_KEYS = ("telegram_bot_token", "telegram_channel", "notification_sinks", "notify_deadline")
+ANOMALY_KEYS = ("anomaly_enabled", "anomaly_db", "anomaly_fields", "anomaly_window_hours",
+                "anomaly_threshold", "anomaly_min_points")
+
+class OzonApiError(Exception):
+    """Raised when prices cannot be fetched from Ozon API"""
+
 class OzonPriceMonitor:
-    def __init__(self):
-        self.config = config.load_config()
+    def __init__(self, config_overrides=None):
+        # Shared read-only config snapshot; overrides are applied on top of it
+        self.config_source = config.get_config()
+        self.config_overrides = dict(config_overrides or {})
+        self.config = self.config_source
+        if self.config_overrides:
+            self.config = config.freeze(dict(self.config_source, **self.config_overrides))
+        logging_setup.configure_logging(self.config)
         self.running = False
         self.last_result = "Мониторинг не запущен"
         self.update_callback = None
+        self.delta_callback = None
+
+        # In-memory state for status queries. Containers are replaced, never
+        # mutated in place, so readers in other threads need no locking.
+        self.run_in_progress = False
+        self.run_count = 0
+        self.last_run_started = None
+        self.last_run_finished = None
+        self.last_discrepancies = ()
+        self.discrepancy_history = deque(maxlen=DISCREPANCY_HISTORY_SIZE)
+
+        # Changes against the previous run, published once the run is finished
+        self.run_delta = None
+        self.last_delta = None
+
+        # Record/replay of API traffic
+        self.recorder = None
+        self.replayer = None
+        self.setup_recorder()
+
+        # Opt-in per-run profiling, toggled from config or a signal
+        self.profiling = self.config["profiling_enabled"]
+        self.profiler = None
+
+        # Analysis results of unchanged pages are reused between runs
+        self.page_cache = PageAnalysisCache(self.config["page_cache_size"])
+
+        # Discrepancies collected across runs in digest mode
+        self.digest = None
+        self.digest_flush_requested = False
+
+        # Notification sinks (Telegram channels, webhooks, files, syslog)
+        self.notifier = None
+        self.setup_notifications()
+
+        # Detection of sudden price moves over stored history
+        self.anomaly_detector = None
+        self.setup_anomaly_detector()
+
+        # Deadlines for runs and their phases, cycle time statistics
+        self.run_lock = threading.Lock()
+        self.slo_exceeded = False
+        self.watchdog = RunWatchdog(on_stall=self.report_stall)
+        self.setup_watchdog()
 
     def set_update_callback(self, callback):
         """Set callback function to update GUI"""
         self.update_callback = callback
 
+    def set_delta_callback(self, callback):
+        """Set callback function receiving the changes found by each run"""
+        self.delta_callback = callback
+
     def update_config(self):
-        """Reload configuration"""
-        self.config = config.load_config()
+        """Reload configuration if the config file changed.
+
+        Called at the start of each run with run_lock held, so sinks, the
+        recorder and the anomaly detector are never replaced mid-run.
+        """
+        new_config = config.get_config()
+        if new_config is not self.config_source:
+            self.apply_config(new_config)
+
+    def apply_config(self, new_config):
+        """Switch to a new configuration snapshot"""
+        old_config = self.config
+        self.config_source = new_config
+        if self.config_overrides:
+            new_config = config.freeze(dict(new_config, **self.config_overrides))
+        self.config = new_config
+
+        def changed(keys):
+            return any(old_config.get(key) != new_config.get(key) for key in keys)
+
+        logging_setup.configure_logging(self.config)
+        if changed(RECORDER_KEYS):
+            self.setup_recorder()
+        self.profiling = self.config["profiling_enabled"]
+        self.page_cache.max_entries = self.config["page_cache_size"]
+        if changed(NOTIFICATION_KEYS):
+            self.setup_notifications()
+        if changed(ANOMALY_KEYS):
+            self.setup_anomaly_detector()
+        self.setup_watchdog()
         logger.info("Configuration updated")
 
-    def send_telegram_message(self, message):
-        """Send a message to Telegram channel"""
-        if not self.config["telegram_bot_token"] or not self.config["telegram_channel"]:
-            logger.warning("Telegram credentials not configured")
-            return False
-
-        telegram_api_url = f"https://api.telegram.org/bot{self.config['telegram_bot_token']}/sendMessage"
-        payload = {
-            "chat_id": self.config["telegram_channel"],
-            "text": message,
-            "parse_mode": "HTML"
-        }
-
+    def toggle_profiling(self):
+        """Toggle per-run profiling without changing the config"""
+        self.profiling = not self.profiling
+        logger.info(f"Profiling {'enabled' if self.profiling else 'disabled'}")
+
+    def start_profiler(self):
+        """Create or drop the profiler to match the profiling flag"""
+        if self.profiling and not self.profiler:
+            self.profiler = RunProfiler(
+                profile_dir=self.config["profile_dir"],
+                keep=self.config["profile_keep"],
+                top_n=self.config["profile_top_n"]
+            )
+        elif not self.profiling and self.profiler:
+            self.profiler.close()
+            self.profiler = None
+
+        if self.profiler:
+            self.profiler.start()
+        return self.profiler
+
+    def setup_recorder(self):
+        """Start or stop recording API traffic according to config"""
+        if self.config["record_api"] and not self.recorder:
+            try:
+                self.recorder = ApiRecorder(new_capture_path(self.config["capture_dir"]))
+            except Exception as e:
+                logger.error(f"Error starting API recorder: {str(e)}")
+        elif not self.config["record_api"] and self.recorder:
+            self.recorder.close()
+            self.recorder = None
+
+    def post(self, url, **kwargs):
+        """Make a POST request, recording or replaying it if enabled"""
+        if self.replayer:
+            return self.replayer.post(url, **kwargs)
+
+        # Imported here, requests is slow to import and not needed before the first check
+        import requests
+
+        started = time.monotonic()
         try:
-            response = requests.post(telegram_api_url, json=payload)
-            if response.status_code != 200:
-                logger.error(f"Failed to send Telegram message: {response.text}")
-                # If message is too long, split it and try again
-                if "message is too long" in response.text.lower():
-                    logger.info("Message too long, splitting and retrying...")
-                    messages = self.split_long_message(message)
-                    for msg in messages:
-                        time.sleep(1)  # Avoid hitting rate limits
-                        self.send_telegram_message(msg)
-                return False
-            else:
-                logger.info("Telegram message sent successfully")
-                return True
+            response = requests.post(url, **kwargs)
         except Exception as e:
-            logger.error(f"Error sending Telegram message: {str(e)}")
-            return False
+            if self.recorder:
+                self.recorder.record(url, kwargs.get("headers"), kwargs.get("json"),
+                                     elapsed=time.monotonic() - started, error=str(e))
+            raise
+
+        if self.recorder:
+            try:
+                self.recorder.record(url, kwargs.get("headers"), kwargs.get("json"),
+                                     response, time.monotonic() - started)
+            except Exception as e:
+                logger.error(f"Error recording API response: {str(e)}")
+        return response
+
+    def setup_notifications(self):
+        """Recreate notification sinks from config"""
+        if self.notifier:
+            self.notifier.close()
+        self.notifier = NotificationDispatcher(
+            create_sinks(self.config, self.post),
+            deadline=self.config["notify_deadline"],
+            on_stall=self.report_notify_stall
+        )
+
+    def setup_anomaly_detector(self):
+        """Create the anomaly detector if enabled in config"""
+        if not self.config["anomaly_enabled"]:
+            self.anomaly_detector = None
+            return
+        self.anomaly_detector = PriceAnomalyDetector(
+            db_path=self.config["anomaly_db"],
+            window_hours=self.config["anomaly_window_hours"],
+            threshold_pct=self.config["anomaly_threshold"],
+            min_points=self.config["anomaly_min_points"],
+            fields=self.config["anomaly_fields"]
+        )
+
+    def setup_watchdog(self):
+        """Apply run and phase deadlines from config"""
+        self.watchdog.run_deadline = self.config["run_deadline"]
+        self.watchdog.slo_seconds = self.config["run_slo_seconds"]
+        self.watchdog.phase_deadlines = {
+            "fetch_page": self.config["fetch_page_deadline"],
+            "analyze": self.config["analyze_deadline"]
+        }
 
-    def split_long_message(self, message, max_length=4000):
-        """Split a long message into smaller chunks"""
-        if len(message) <= max_length:
-            return [message]
+    def report_stall(self, phase, elapsed):
+        """Surface a stalled run or phase in status and notifications"""
+        phase_names = {
+            "run": "проверка целиком",
+            "fetch_page": "загрузка страницы цен",
+            "analyze": "анализ цен"
+        }
+        phase_name = phase_names.get(phase, phase)
+        if phase == "run":
+            message = (f"Проверка превысила лимит времени ({int(elapsed)} с) и будет прервана "
+                       f"перед загрузкой или анализом следующей страницы")
+        else:
+            message = f"Этап «{phase_name}» выполняется дольше лимита ({int(elapsed)} с)"
 
-        # Find a good splitting point (newline)
-        split_point = message[:max_length].rfind('\n')
-        if split_point == -1:  # No newline found, force split
-            split_point = max_length
+        self.last_result = message
+        if self.update_callback:
+            self.update_callback()
+        self.notify(f"<b>⏱ Зависание мониторинга цен</b>\n\n{message}", kind="stall")
 
-        return [message[:split_point]] + self.split_long_message(message[split_point:], max_length)
+    def report_notify_stall(self, sink_name, elapsed):
+        """Surface a notification delivery that exceeded notify_deadline"""
+        self.watchdog.record_stall("notify", elapsed, sink=sink_name)
+        message = f"Отправка уведомления получателю {sink_name} выполняется дольше лимита ({int(elapsed)} с)"
+        self.last_result = message
+        if self.update_callback:
+            self.update_callback()
+        self.notify(f"<b>⏱ Зависание мониторинга цен</b>\n\n{message}", kind="stall")
+
+    def notify(self, text, kind="report", discrepancies=(), document=None):
+        """Send a notification to all configured sinks without waiting for delivery"""
+        if not self.notifier.sinks:
+            logger.warning("No notification sinks configured")
+            return 0
+        # Never raise: notify is called from error handlers and the watchdog
+        try:
+            return self.notifier.dispatch(Notification(text, kind, discrepancies, document))
+        except Exception as e:
+            logger.error(f"Error queueing {kind} notification: {str(e)}")
+            return 0
 
-    def get_ozon_prices(self):
-        """Get prices from Ozon API"""
+    def iter_price_pages(self):
+        """Fetch price pages from Ozon API, following the cursor"""
         if not self.config["client_id"] or not self.config["api_key"]:
-            logger.error("Ozon API credentials not configured")
-            return None
-
-        # API endpoint
-        url = "https://api-seller.ozon.ru/v5/product/info/prices"
+            raise OzonApiError("Ozon API credentials not configured")
 
         # Headers
         headers = {
@@ -92,51 +284,63 @@ class OzonPriceMonitor:
             "Content-Type": "application/json"
         }
 
-        # Request payload
-        payload = {
-            "cursor": "",
-            "filter": {
-                "visibility": self.config["visibility"]
-            },
-            "limit": 100
-        }
+        cursor = ""
+        page_number = 0
+        while True:
+            self.watchdog.check_cancelled()
+
+            # Request payload
+            payload = {
+                "cursor": cursor,
+                "filter": {
+                    "visibility": self.config["visibility"]
+                },
+                "limit": PAGE_LIMIT
+            }
 
-        try:
-            # Make the request
-            response = requests.post(url, headers=headers, json=payload)
-            logger.info(f"API Status Code: {response.status_code}")
-
-            if response.status_code == 200:
-                return response.json()
-            else:
-                error_msg = f"API Error: {response.text}"
-                logger.error(error_msg)
-                self.last_result = error_msg
-                if self.update_callback:
-                    self.update_callback()
-                return None
-        except Exception as e:
-            error_msg = f"Error making API request: {str(e)}"
-            logger.error(error_msg)
-            self.last_result = error_msg
-            if self.update_callback:
-                self.update_callback()
-            return None
+            started = time.perf_counter()
+            try:
+                # Make the request
+                with self.watchdog.track("fetch_page"):
+                    response = self.post(OZON_PRICES_URL, headers=headers, json=payload,
+                                         timeout=self.config["fetch_page_deadline"])
+            except Exception as e:
+                raise OzonApiError(f"Error making API request: {str(e)}")
+            page_number += 1
+            logger.info(f"API Status Code: {response.status_code}", extra={
+                "page": page_number,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1)
+            })
 
-    def analyze_prices(self, data):
-        """Analyze prices and send alerts for discrepancies"""
-        if not data or "items" not in data:
-            logger.error("No valid data to analyze")
-            self.last_result = "Ошибка: нет данных для анализа"
-            if self.update_callback:
-                self.update_callback()
-            return
+            if response.status_code != 200:
+                raise OzonApiError(f"API Error: {response.text}")
+
+            data = response.json()
+            items = data.get("items", [])
+            yield {
+                "cursor": cursor,
+                "items": items,
+                "fingerprint": hashlib.sha1(response.content).hexdigest()
+            }
 
-        discrepancies_found = False
-        current_time = datetime.now().strftime("%d.%m.%Y %H:%M:%S")
-        message_parts = [f"<b>⚠️ Отчет о расхождениях в ценах товаров</b>\n<i>Время проверки: {current_time}</i>\n"]
+            # Stop on the last page
+            next_cursor = data.get("cursor", "")
+            if len(items) < PAGE_LIMIT or not next_cursor or next_cursor == cursor:
+                break
+            cursor = next_cursor
+
+    def report_api_error(self, error):
+        """Log an Ozon API error and show it as the last result"""
+        error_msg = str(error)
+        logger.error(error_msg)
+        self.last_result = error_msg
+        if self.update_callback:
+            self.update_callback()
 
-        for item in data.get("items", []):
+    def find_discrepancies(self, items):
+        """Return (offer_id, product_id, prices) for items with differing prices"""
+        found = []
+        for item in items:
             offer_id = item.get("offer_id", "")
             product_id = item.get("product_id", "")
 
@@ -146,71 +350,367 @@ class OzonPriceMonitor:
 
             # Only check prices that are enabled in config
             prices = {
-                "Цена (marketing_seller_price)": marketing_seller_price
+                "marketing_seller_price": marketing_seller_price
             }
 
             if self.config["check_min_price"]:
-                prices["Минимальная цена (min_price)"] = price_data.get("min_price", 0)
+                prices["min_price"] = price_data.get("min_price", 0)
 
             if self.config["check_marketing_price"]:
-                prices["Цена Озон (marketing_price)"] = price_data.get("marketing_price", 0)
+                prices["marketing_price"] = price_data.get("marketing_price", 0)
 
             if self.config["check_price"]:
-                prices["Цена Озон 2 (price)"] = price_data.get("price", 0)
+                prices["price"] = price_data.get("price", 0)
 
             # Remove zero values
             prices = {k: v for k, v in prices.items() if v != 0}
 
             # Check if all non-zero prices are equal
             if len(set(prices.values())) > 1:
-                discrepancies_found = True
+                found.append((offer_id, product_id, prices))
+        return found
+
+    def analyze_page(self, page):
+        """Find discrepancies on one page, reusing the result for unchanged pages"""
+        fingerprint = page.get("fingerprint")
+        if fingerprint is None:
+            return self.find_discrepancies(page["items"])
+
+        key = (
+            self.config["client_id"],
+            self.config["visibility"],
+            page["cursor"],
+            self.config["check_min_price"],
+            self.config["check_marketing_price"],
+            self.config["check_price"]
+        )
+        found = self.page_cache.get(key, fingerprint)
+        if found is None:
+            found = self.find_discrepancies(page["items"])
+            self.page_cache.put(key, fingerprint, found)
+        return found
 
-                # Create message for this product
-                product_msg = f"<b>Товар: {offer_id}</b> (ID: {product_id})\n"
-                for price_name, price_value in prices.items():
-                    product_msg += f"- {price_name}: {price_value} руб.\n"
+    def analyze_prices(self, data):
+        """Analyze prices and send alerts for discrepancies"""
+        if not data or ("items" not in data and "pages" not in data):
+            logger.error("No valid data to analyze")
+            self.last_result = "Ошибка: нет данных для анализа"
+            if self.update_callback:
+                self.update_callback()
+            return
 
-                # Add product URL
-                product_url = f"https://seller.ozon.ru/app/products/card/{product_id}"
-                product_msg += f"<a href='{product_url}'>Ссылка на товар в личном кабинете</a>\n"
+        # A raw API response is analyzed as a single uncached page
+        pages = data.get("pages")
+        if pages is None:
+            pages = [{"cursor": None, "items": data["items"]}]
 
-                message_parts.append(product_msg)
+        discrepancies = []
+        checked_at = datetime.now()
+        current_time = checked_at.strftime("%d.%m.%Y %H:%M:%S")
+        message_parts = [f"<b>⚠️ Отчет о расхождениях в ценах товаров</b>\n<i>Время проверки: {current_time}</i>\n"]
 
+        exporter = self.start_export(checked_at)
+        self.page_cache.reset_stats()
+        try:
+            for page in pages:
+                self.watchdog.check_cancelled()
+                page_discrepancies = []
+                with self.watchdog.track("analyze"):
+                    found = self.analyze_page(page)
+                for offer_id, product_id, prices in found:
+                    page_discrepancies.append({
+                        "account": self.config["client_id"],
+                        "offer_id": offer_id,
+                        "product_id": product_id,
+                        "prices": prices,
+                        "detected_at": checked_at.isoformat(timespec="seconds")
+                    })
+
+                    # Create message for this product
+                    product_msg = f"<b>Товар: {offer_id}</b> (ID: {product_id})\n"
+                    for price_name, price_value in prices.items():
+                        product_msg += f"- {PRICE_LABELS[price_name]}: {price_value} руб.\n"
+
+                    # Add product URL
+                    product_url = f"https://seller.ozon.ru/app/products/card/{product_id}"
+                    product_msg += f"<a href='{product_url}'>Ссылка на товар в личном кабинете</a>\n"
+
+                    message_parts.append(product_msg)
+
+                discrepancies.extend(page_discrepancies)
+                if exporter:
+                    exporter.write_page(page["items"], page_discrepancies)
+                if self.anomaly_detector:
+                    self.anomaly_detector.observe(page["items"], self.config["client_id"], checked_at)
+        except Exception:
+            if exporter:
+                exporter.abort()
+            if self.anomaly_detector:
+                self.anomaly_detector.discard()
+            raise
+
+        if exporter:
+            self.finish_export(exporter)
+        if self.anomaly_detector:
+            self.report_anomalies(checked_at)
+
+        hits, misses = self.page_cache.reset_stats()
+        logger.info(f"Page cache: {hits} unchanged page(s) reused, {misses} analyzed",
+                    extra={"cache_hits": hits, "cache_misses": misses})
+
+        if not self.config["digest_enabled"] and self.digest:
+            # Send what was collected before digest mode was switched off
+            self.flush_digest()
+            self.digest = None
+
+        if self.config["digest_enabled"]:
+            result_msg = self.collect_digest(discrepancies, checked_at)
         # Send message if discrepancies found
-        if discrepancies_found:
+        elif discrepancies:
             message_parts.append("\n<i>Рекомендуется проверить настройки цен для указанных товаров.</i>")
             full_message = "\n".join(message_parts)
-            self.send_telegram_message(full_message)
-            result_msg = f"Найдены расхождения в ценах. Отчет отправлен в Telegram ({current_time})"
+            self.notify(full_message, discrepancies=discrepancies)
+            result_msg = f"Найдены расхождения в ценах. Отчет отправлен ({current_time})"
             logger.info("Price discrepancies found and notification sent")
         else:
             result_msg = f"Расхождений в ценах не обнаружено ({current_time})"
             logger.info("No price discrepancies found")
 
+        self.store_discrepancies(discrepancies)
         self.last_result = result_msg
         if self.update_callback:
             self.update_callback()
 
+    def start_export(self, checked_at):
+        """Open file exports for this run if enabled"""
+        if not self.config["export_enabled"]:
+            return None
+        if not self.config["export_csv"] and not (self.config["export_parquet"] and parquet_available()):
+            logger.warning("Export is enabled but no available export format is selected")
+            return None
+        try:
+            return RunExporter(
+                self.config["export_dir"],
+                logging_setup.current_run_id.get() or checked_at.strftime("%Y%m%d%H%M%S"),
+                checked_at,
+                self.config["client_id"],
+                csv_enabled=self.config["export_csv"],
+                parquet_enabled=self.config["export_parquet"],
+                include_snapshot=self.config["export_snapshot"]
+            )
+        except Exception as e:
+            logger.error(f"Error starting export: {str(e)}")
+            return None
+
+    def finish_export(self, exporter):
+        """Complete the export of this run and apply retention"""
+        try:
+            paths = exporter.close()
+            logger.info(f"Exported run to {', '.join(paths)}")
+            removed = cleanup_exports(self.config["export_dir"], self.config["export_retention_days"])
+            if removed:
+                logger.info(f"Removed {removed} old export file(s)")
+        except Exception as e:
+            logger.error(f"Error finishing export: {str(e)}")
+
+    def report_anomalies(self, checked_at):
+        """Store price history of this run and alert about sudden price moves"""
+        try:
+            anomalies = self.anomaly_detector.commit()
+        except Exception as e:
+            logger.error(f"Error updating price history: {str(e)}")
+            return
+
+        if anomalies:
+            logger.info(f"Price anomalies found: {len(anomalies)}", extra={"anomalies": len(anomalies)})
+            self.notify(format_anomalies(anomalies, PRICE_LABELS, checked_at),
+                        kind="anomaly", discrepancies=anomalies)
+
+    def collect_digest(self, discrepancies, checked_at):
+        """Add discrepancies to the digest and send it when its window ends"""
+        if (self.digest is None
+                or self.digest.window.total_seconds() != self.config["digest_window"] * 60
+                or self.digest.top_n != self.config["digest_top_n"]):
+            self.flush_digest()
+            self.digest = DigestCollector(self.config["digest_window"], self.config["digest_top_n"], PRICE_LABELS)
+
+        self.digest.add(discrepancies, checked_at)
+        current_time = checked_at.strftime("%d.%m.%Y %H:%M:%S")
+
+        if self.digest.due(checked_at):
+            count = len(self.digest.entries)
+            self.flush_digest(checked_at)
+            return f"Сводка по {count} товарам с расхождениями отправлена ({current_time})"
+        if self.digest.entries:
+            next_flush = self.digest.next_flush().strftime("%H:%M")
+            return (f"Найдено расхождений: {len(discrepancies)}. "
+                    f"Сводка будет отправлена в {next_flush} ({current_time})")
+        return f"Расхождений в ценах не обнаружено ({current_time})"
+
+    def flush_digest(self, now=None):
+        """Send the collected digest, if any"""
+        if not self.digest or not self.digest.entries:
+            return
+        entries = list(self.digest.entries.values())
+        summary, csv_bytes, filename = self.digest.flush(now)
+        self.notify(summary, kind="digest", discrepancies=entries, document=(filename, csv_bytes))
+        logger.info("Price discrepancy digest sent")
+
+    def store_discrepancies(self, discrepancies):
+        """Publish discrepancies of the latest run for status queries"""
+        self.run_delta = diff_discrepancies(self.last_discrepancies, discrepancies)
+        self.run_delta["total"] = len(discrepancies)
+        self.last_discrepancies = tuple(discrepancies)
+        self.discrepancy_history.extend(discrepancies)
+
+    def publish_delta(self, duration):
+        """Pass the changes found by the finished run to the delta callback"""
+        delta, self.run_delta = self.run_delta, None
+        if delta is None:
+            # The run failed before its discrepancies were stored
+            return
+        delta["run_id"] = logging_setup.current_run_id.get()
+        delta["duration"] = round(duration, 1)
+        self.last_delta = delta
+        summary = delta_summary(delta)
+        logger.info(f"Discrepancy changes: {summary['new']} new, {summary['changed']} changed, "
+                    f"{summary['resolved']} resolved", extra=summary)
+        if self.delta_callback:
+            self.delta_callback(delta)
+
+    def get_status(self):
+        """Return a snapshot of the monitor state"""
+        return {
+            "running": self.running,
+            "run_in_progress": self.run_in_progress,
+            "run_count": self.run_count,
+            "last_run_started": self.last_run_started,
+            "last_run_finished": self.last_run_finished,
+            "last_result": self.last_result,
+            "discrepancies": len(self.last_discrepancies),
+            "last_changes": delta_summary(self.last_delta) if self.last_delta else None,
+            "cycle_time": self.watchdog.stats()
+        }
+
+    def get_discrepancies(self, account=None, since=None):
+        """Return stored discrepancies, optionally filtered by account and time"""
+        if since is None:
+            records = self.last_discrepancies
+        else:
+            since = since.isoformat(timespec="seconds")
+            records = [r for r in tuple(self.discrepancy_history) if r["detected_at"] >= since]
+        if account:
+            records = [r for r in records if r["account"] == account]
+        return list(records)
+
     def run_once(self):
         """Run price monitoring once"""
-        logger.info("Starting Ozon price monitoring")
+        if not self.run_lock.acquire(blocking=False):
+            logger.warning("Previous price monitoring run is still in progress, skipping")
+            return
 
+        # Whatever happens in the run, the lock must be released, otherwise
+        # every following run would be skipped
+        self.run_in_progress = True
         try:
-            # Get data from Ozon API
-            data = self.get_ozon_prices()
-
-            # Analyze prices and send alerts if needed
-            if data:
-                self.analyze_prices(data)
+            self._run_once()
+        finally:
+            self.run_count += 1
+            self.last_run_finished = datetime.now().isoformat(timespec="seconds")
+            self.run_in_progress = False
+            logging_setup.set_run_id(None)
+            self.run_lock.release()
+
+    def _run_once(self):
+        """Run price monitoring once, called with run_lock held"""
+        run_id = uuid.uuid4().hex[:12]
+        logging_setup.set_run_id(run_id)
+        started = time.perf_counter()
+        logger.info("Starting Ozon price monitoring")
+        self.watchdog.start_run()
+        self.last_run_started = datetime.now().isoformat(timespec="seconds")
+        self.update_config()
+        profiler = self.start_profiler()
 
-            logger.info("Price monitoring completed")
+        try:
+            # Stream pages from Ozon API through the analysis
+            self.analyze_prices({"pages": self.iter_price_pages()})
+
+            logger.info("Price monitoring completed", extra={
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1)
+            })
+        except OzonApiError as e:
+            self.report_api_error(e)
+        except RunCancelled as e:
+            logger.error(str(e))
+            self.last_result = f"Проверка прервана: превышен лимит времени {self.config['run_deadline']} с"
+            if self.update_callback:
+                self.update_callback()
         except Exception as e:
             error_msg = f"Critical error in price monitoring: {str(e)}"
             logger.error(error_msg)
-            self.send_telegram_message(f"<b>❌ Ошибка мониторинга цен</b>\n\n{error_msg}")
+            self.notify(f"<b>❌ Ошибка мониторинга цен</b>\n\n{error_msg}", kind="error")
             self.last_result = f"Ошибка: {str(e)}"
             if self.update_callback:
                 self.update_callback()
+        finally:
+            if profiler:
+                try:
+                    summary = profiler.stop()
+                    self.last_result = f"{self.last_result}\n\n{summary}"
+                    if self.update_callback:
+                        self.update_callback()
+                except Exception as e:
+                    logger.error(f"Error saving profile: {str(e)}")
+            try:
+                if self.digest_flush_requested:
+                    # Monitoring was stopped while this run was in progress
+                    self.digest_flush_requested = False
+                    self.flush_digest()
+                self.publish_delta(self.check_slo())
+            except Exception as e:
+                logger.error(f"Error finishing price monitoring run: {str(e)}")
+
+    def request_digest_flush(self):
+        """Send the collected digest now, or at the end of the current run"""
+        if self.run_lock.acquire(blocking=False):
+            try:
+                self.flush_digest()
+            finally:
+                self.run_lock.release()
+        else:
+            self.digest_flush_requested = True
+
+    def shutdown(self, timeout=10):
+        """Send the digest and wait up to timeout seconds for queued notifications"""
+        self.running = False
+        self.request_digest_flush()
+        closer = threading.Thread(target=self.notifier.close, kwargs={"wait": True}, daemon=True)
+        closer.start()
+        closer.join(timeout)
+        if closer.is_alive():
+            logger.warning("Some notifications were not delivered before exit")
+
+    def check_slo(self):
+        """Record the run duration and alert when the run time SLO is exceeded.
+
+        Returns the run duration in seconds.
+        """
+        duration, exceeded = self.watchdog.finish_run()
+        stats = self.watchdog.stats()
+        logger.info(f"Run took {duration:.1f} s (p50 {stats['p50']} s, p95 {stats['p95']} s)",
+                    extra={"duration_ms": round(duration * 1000, 1), "p50": stats["p50"], "p95": stats["p95"]})
+
+        # Alert once when the SLO is first exceeded, not on every slow run
+        if exceeded and not self.slo_exceeded:
+            self.notify(
+                f"<b>🐢 Проверка цен выполняется медленно</b>\n\n"
+                f"Длительность: {duration:.1f} с при норме {self.watchdog.slo_seconds} с\n"
+                f"p50: {stats['p50']} с, p95: {stats['p95']} с",
+                kind="slo"
+            )
+        self.slo_exceeded = exceeded
+        return duration
 
     def start_monitoring(self):
         """Start continuous monitoring"""
@@ -230,6 +730,9 @@ class OzonPriceMonitor:
         self.running = False
         logger.info("Continuous monitoring stopped")
 
+        # Do not lose discrepancies collected for the digest
+        self.request_digest_flush()
+
         # Update status
         self.last_result = "Мониторинг остановлен"
         if self.update_callback:
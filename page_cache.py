@@ -0,0 +1,49 @@
+import threading
+from collections import OrderedDict
+
+class PageAnalysisCache:
+    """LRU cache of per-page analysis results keyed by page position.
+
+    An entry is reused only while the fingerprint of the fetched page is
+    unchanged; a different fingerprint replaces the entry. The number of
+    entries is bounded by max_entries, least recently used pages are
+    evicted first.
+    """
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, fingerprint):
+        """Return the cached result for key if its fingerprint matches"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != fingerprint:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, fingerprint, result):
+        """Store the analysis result of a page"""
+        with self.lock:
+            self.entries[key] = (fingerprint, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def reset_stats(self):
+        """Reset hit/miss counters, returning the previous values"""
+        with self.lock:
+            stats = (self.hits, self.misses)
+            self.hits = self.misses = 0
+            return stats
+
+    def clear(self):
+        """Drop all cached pages"""
+        with self.lock:
+            self.entries.clear()
@@ -0,0 +1,91 @@
+import glob
+import io
+import logging
+import os
+import tracemalloc
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+class RunProfiler:
+    """Capture cProfile stats and tracemalloc growth for monitoring runs.
+
+    Each run writes <name>.prof (load with pstats or snakeviz) and
+    <name>_mem.txt to profile_dir; only the newest `keep` runs are kept.
+    Memory growth is measured against the snapshot taken after the
+    previous profiled run, so leaks across runs show up in the diff.
+    """
+
+    def __init__(self, profile_dir="profiles", keep=20, top_n=10):
+        self.profile_dir = profile_dir
+        self.keep = keep
+        self.top_n = top_n
+        self.profile = None
+        self.previous_snapshot = None
+        self.started_tracing = False
+
+    def start(self):
+        """Start profiling a run"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        # Tracing may already be on (-X tracemalloc, PYTHONTRACEMALLOC)
+        if self.previous_snapshot is None:
+            self.previous_snapshot = tracemalloc.take_snapshot()
+        import cProfile
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self):
+        """Stop profiling, save results and return a short text summary"""
+        self.profile.disable()
+        snapshot = tracemalloc.take_snapshot()
+        growth = snapshot.compare_to(self.previous_snapshot, "lineno")
+        self.previous_snapshot = snapshot
+
+        os.makedirs(self.profile_dir, exist_ok=True)
+        base_path = os.path.join(self.profile_dir, datetime.now().strftime("run_%Y%m%d_%H%M%S_%f"))
+        self.profile.dump_stats(f"{base_path}.prof")
+        with open(f"{base_path}_mem.txt", "w", encoding="utf-8") as f:
+            for stat in growth[:self.top_n]:
+                f.write(f"{stat}\n")
+        self.rotate()
+
+        import pstats
+        summary = self.summarize(pstats.Stats(self.profile, stream=io.StringIO()), growth)
+        logger.info(f"Profile saved to {base_path}.prof")
+        self.profile = None
+        return summary
+
+    def summarize(self, stats, growth):
+        """Build a summary of top functions and allocation growth"""
+        lines = [f"Профилирование (всего {stats.total_tt:.3f} с):", "Топ функций по суммарному времени:"]
+        entries = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+        for (filename, line, func), (cc, nc, tt, ct, callers) in entries[:self.top_n]:
+            lines.append(f"  {ct:.3f} с  {nc} выз.  {func} ({os.path.basename(filename)}:{line})")
+
+        total_growth = sum(stat.size_diff for stat in growth)
+        lines.append(f"Рост памяти: {total_growth / 1024:+.1f} КБ")
+        for stat in growth[:self.top_n]:
+            if stat.size_diff <= 0:
+                break
+            frame = stat.traceback[0]
+            lines.append(f"  {stat.size_diff / 1024:+.1f} КБ  {os.path.basename(frame.filename)}:{frame.lineno}")
+        return "\n".join(lines)
+
+    def rotate(self):
+        """Delete profiles beyond the newest `keep` runs"""
+        profiles = sorted(glob.glob(os.path.join(self.profile_dir, "run_*.prof")))
+        for path in profiles[:-self.keep] if self.keep > 0 else []:
+            for old_file in (path, path[:-len(".prof")] + "_mem.txt"):
+                try:
+                    os.remove(old_file)
+                except OSError:
+                    pass
+
+    def close(self):
+        """Stop memory tracing if this profiler started it"""
+        if self.started_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.started_tracing = False
+        self.previous_snapshot = None
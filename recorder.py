@@ -0,0 +1,191 @@
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+from urllib.parse import urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+# Headers whose values are written to a capture, all others are masked
+ALLOWED_HEADERS = ("content-type", "accept")
+BOT_TOKEN_RE = re.compile(r"/bot[^/]+/")
+
+# Requests to this host are replayed and keep their full URL
+OZON_API_HOST = "api-seller.ozon.ru"
+
+def redact_url(url):
+    """Remove credentials from a URL.
+
+    Ozon API URLs are kept as they are. For other hosts (Telegram,
+    webhooks) tokens may be anywhere in the path or query, so only the
+    scheme and host are kept, plus a hash that tells endpoints apart.
+    """
+    parts = urlsplit(url)
+    if parts.hostname == OZON_API_HOST:
+        return url
+    host = parts.netloc.rpartition("@")[2]
+    digest = hashlib.sha256(f"{parts.path}?{parts.query}".encode("utf-8")).hexdigest()[:12]
+    return urlunsplit((parts.scheme, host, f"/{digest}", "", ""))
+
+def redact_text(text, url):
+    """Remove the URL of a request and its parts from an error message"""
+    parts = urlsplit(url)
+    secrets = [url, parts.path, parts.query, parts.username, parts.password]
+    if parts.query:
+        secrets.insert(1, f"{parts.path}?{parts.query}")
+    for secret in secrets:
+        if secret and secret != "/":
+            text = text.replace(secret, "***")
+    return BOT_TOKEN_RE.sub("/bot***/", text)
+
+def redact_headers(headers):
+    """Replace all header values except harmless ones with a placeholder"""
+    return {k: (v if k.lower() in ALLOWED_HEADERS else "***") for k, v in (headers or {}).items()}
+
+def new_capture_path(capture_dir):
+    """Build a timestamped capture file path inside capture_dir"""
+    os.makedirs(capture_dir, exist_ok=True)
+    name = datetime.now().strftime("capture_%Y%m%d_%H%M%S.jsonl.gz")
+    return os.path.join(capture_dir, name)
+
+class ApiRecorder:
+    """Write every API request and response to a gzip-compressed JSONL capture"""
+
+    def __init__(self, path):
+        self.path = path
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.file = gzip.open(path, "at", encoding="utf-8")
+        logger.info(f"Recording API traffic to {path}")
+
+    def record(self, url, headers, payload, response=None, elapsed=0.0, error=None):
+        """Append one request/response pair to the capture"""
+        entry = {
+            "t": round(time.monotonic() - self.started - elapsed, 6),
+            "elapsed": round(elapsed, 6),
+            "url": redact_url(url),
+            "headers": redact_headers(headers),
+            "payload": payload,
+            "status": response.status_code if response is not None else None,
+            "body": response.text if response is not None else None,
+            "error": redact_text(error, url) if error else None
+        }
+        line = json.dumps(entry, ensure_ascii=False)
+        with self.lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+
+    def close(self):
+        """Close the capture file"""
+        with self.lock:
+            self.file.close()
+
+class ReplayResponse:
+    """Minimal stand-in for requests.Response built from a capture entry"""
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode("utf-8")
+
+    def json(self):
+        return json.loads(self.text)
+
+class ApiReplayer:
+    """Serve recorded responses instead of making network requests.
+
+    Entries are matched by redacted URL in the order they were recorded.
+    With realtime=True requests are held back until their recorded start
+    time relative to the first request, including the pauses between
+    runs, and each response is delayed by its recorded latency. Otherwise
+    responses are returned immediately.
+    """
+
+    def __init__(self, path, realtime=False):
+        self.path = path
+        self.realtime = realtime
+        self.entries = defaultdict(deque)
+        self.lock = threading.Lock()
+        self.started = None
+        self.first_t = None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.entries[entry["url"]].append(entry)
+
+    def remaining(self, url_part=""):
+        """Count unreplayed entries whose URL contains url_part"""
+        with self.lock:
+            return sum(len(q) for url, q in self.entries.items() if url_part in url)
+
+    def wait_for(self, entry):
+        """Sleep until the recorded start time of entry"""
+        with self.lock:
+            if self.started is None:
+                self.started = time.monotonic()
+                self.first_t = entry["t"]
+            delay = (entry["t"] - self.first_t) - (time.monotonic() - self.started)
+        if delay > 0:
+            time.sleep(delay)
+
+    def post(self, url, headers=None, json=None, **kwargs):
+        """Return the next recorded response for this URL"""
+        with self.lock:
+            queue = self.entries.get(redact_url(url))
+            entry = queue.popleft() if queue else None
+
+        if entry is None:
+            if urlsplit(url).hostname != OZON_API_HOST:
+                # Notifications are never sent during replay
+                return ReplayResponse(200, '{"ok": true}')
+            raise ConnectionError(f"No recorded response left for {redact_url(url)}")
+
+        if self.realtime:
+            self.wait_for(entry)
+            time.sleep(entry["elapsed"])
+        if entry["error"]:
+            raise ConnectionError(entry["error"])
+        return ReplayResponse(entry["status"], entry["body"])
+
+def replay(path, realtime=False):
+    """Feed a capture through the full monitoring pipeline"""
+    import config
+    from ozon_price_monitor import OzonPriceMonitor, OZON_PRICES_URL
+
+    live_config = config.get_config()
+    monitor = OzonPriceMonitor(config_overrides={
+        # Recorded requests are redacted, so real credentials are not needed
+        "client_id": live_config["client_id"] or "replay",
+        "api_key": live_config["api_key"] or "replay",
+        # No local side effects: price history, exports, file/syslog/webhook
+        # sinks and new captures are left untouched by a replay
+        "record_api": False,
+        "anomaly_enabled": False,
+        "export_enabled": False,
+        "notification_sinks": []
+    })
+    monitor.replayer = ApiReplayer(path, realtime=realtime)
+
+    runs = 0
+    started = time.perf_counter()
+    while monitor.replayer.remaining(OZON_PRICES_URL):
+        monitor.run_once()
+        runs += 1
+        print(f"Run {runs}: {monitor.last_result}")
+    print(f"Replayed {runs} run(s) in {time.perf_counter() - started:.3f} s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded Ozon API capture")
+    parser.add_argument("capture", help="Path to a .jsonl.gz capture file")
+    parser.add_argument("--realtime", action="store_true",
+                        help="Replay with the recorded timing: pauses between requests and response latency")
+    args = parser.parse_args()
+    replay(args.capture, realtime=args.realtime)
@@ -0,0 +1,138 @@
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+class RunCancelled(Exception):
+    """Raised inside a run that exceeded its deadline"""
+
+def percentile(values, pct):
+    """Return the nearest-rank percentile of values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+class RunWatchdog:
+    """Enforce deadlines on monitoring runs and their phases.
+
+    A background thread checks the active run once per second. A phase
+    that runs past its deadline is reported once through on_stall; a run
+    past its deadline is also marked cancelled, and the run stops at its
+    next check_cancelled() call. Durations of finished runs are kept for
+    p50/p95 statistics.
+    """
+
+    def __init__(self, run_deadline=600, phase_deadlines=None, slo_seconds=120,
+                 on_stall=None, history_size=100):
+        self.run_deadline = run_deadline
+        self.phase_deadlines = phase_deadlines or {}
+        self.slo_seconds = slo_seconds
+        self.on_stall = on_stall
+        self.durations = deque(maxlen=history_size)
+        self.lock = threading.Lock()
+        self.thread = None
+
+        self.run_started = None
+        self.phase = None
+        self.phase_started = None
+        self.reported = set()
+        self.cancelled = False
+        self.stalls = 0
+        self.last_stall = None
+
+    def start_run(self):
+        """Mark the start of a run"""
+        with self.lock:
+            self.run_started = time.monotonic()
+            self.phase = None
+            self.phase_started = None
+            self.reported = set()
+            self.cancelled = False
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self.watch, daemon=True, name="run-watchdog")
+            self.thread.start()
+
+    def finish_run(self):
+        """Mark the end of a run and return (duration, slo_exceeded)"""
+        with self.lock:
+            duration = time.monotonic() - self.run_started
+            self.run_started = None
+            self.phase = None
+            self.durations.append(duration)
+        return duration, duration > self.slo_seconds
+
+    @contextmanager
+    def track(self, phase):
+        """Context manager marking a phase of the current run"""
+        with self.lock:
+            previous = (self.phase, self.phase_started)
+            self.phase = phase
+            self.phase_started = time.monotonic()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.phase, self.phase_started = previous
+
+    def check_cancelled(self):
+        """Raise RunCancelled if the run exceeded its deadline"""
+        if self.cancelled:
+            raise RunCancelled(f"Run exceeded its deadline of {self.run_deadline} s")
+
+    def watch(self):
+        """Background loop detecting stalled runs and phases"""
+        while True:
+            time.sleep(1)
+            stalls = []
+            with self.lock:
+                if self.run_started is None:
+                    continue
+                now = time.monotonic()
+                deadline = self.phase_deadlines.get(self.phase)
+                if (self.phase and deadline and now - self.phase_started > deadline
+                        and self.phase not in self.reported):
+                    self.reported.add(self.phase)
+                    stalls.append((self.phase, now - self.phase_started))
+                if now - self.run_started > self.run_deadline and "run" not in self.reported:
+                    self.reported.add("run")
+                    self.cancelled = True
+                    stalls.append(("run", now - self.run_started))
+
+            for phase, elapsed in stalls:
+                self.record_stall(phase, elapsed)
+                logger.warning(f"Stall detected in {phase}", extra={"phase": phase, "elapsed_s": round(elapsed, 1)})
+                if self.on_stall:
+                    try:
+                        self.on_stall(phase, elapsed)
+                    except Exception as e:
+                        logger.error(f"Error reporting stall: {str(e)}")
+
+    def record_stall(self, phase, elapsed, **details):
+        """Count a stall for the statistics"""
+        with self.lock:
+            self.stalls += 1
+            self.last_stall = {"phase": phase, "elapsed": round(elapsed, 1), "time": time.time(), **details}
+
+    def stats(self):
+        """Return run duration statistics and the current state"""
+        with self.lock:
+            durations = list(self.durations)
+            active_phase = self.phase
+            running_for = time.monotonic() - self.run_started if self.run_started else None
+        return {
+            "runs_measured": len(durations),
+            "last_duration": round(durations[-1], 3) if durations else None,
+            "p50": round(percentile(durations, 50), 3) if durations else None,
+            "p95": round(percentile(durations, 95), 3) if durations else None,
+            "slo_seconds": self.slo_seconds,
+            "active_phase": active_phase,
+            "running_for": round(running_for, 1) if running_for is not None else None,
+            "stalls": self.stalls,
+            "last_stall": self.last_stall
+        }
@@ -1,6 +1,5 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-import requests
+from tkinter import ttk, messagebox, filedialog
 import config
 
 class SettingsDialog(tk.Toplevel):
@@ -31,6 +30,8 @@ class SettingsDialog(tk.Toplevel):
         self.create_telegram_tab()
         self.create_monitoring_tab()
         self.create_timer_tab()
+        self.create_api_server_tab()
+        self.create_export_tab()
 
         # Create buttons
         self.create_buttons()
@@ -86,6 +87,16 @@ class SettingsDialog(tk.Toplevel):
         help_text = "ALL - контролировать все товары\nIN_SALE - контролировать только товары на витрине"
         ttk.Label(api_frame, text=help_text, foreground="gray").grid(row=3, column=0, columnspan=2, sticky=tk.W, pady=5)
 
+        # Record API traffic
+        ttk.Label(api_frame, text="Записывать ответы API:").grid(row=4, column=0, sticky=tk.W, pady=5)
+        self.record_api_var = tk.BooleanVar(value=self.config["record_api"])
+        ttk.Checkbutton(api_frame, variable=self.record_api_var).grid(row=4, column=1, sticky=tk.W, pady=5)
+
+        # Help text
+        help_text = ("Запросы и ответы сохраняются без ключей в папку captures.\n"
+                     "Воспроизведение: python recorder.py <файл> [--realtime]")
+        ttk.Label(api_frame, text=help_text, foreground="gray").grid(row=5, column=0, columnspan=2, sticky=tk.W, pady=5)
+
     def create_telegram_tab(self):
         """Create Telegram settings tab"""
         telegram_frame = ttk.Frame(self.notebook, padding=10)
@@ -108,6 +119,24 @@ class SettingsDialog(tk.Toplevel):
         # Test button
         ttk.Button(telegram_frame, text="Проверить соединение", command=self.test_telegram).grid(row=3, column=0, columnspan=2, pady=10)
 
+        # Digest mode
+        ttk.Label(telegram_frame, text="Отправлять сводку:").grid(row=4, column=0, sticky=tk.W, pady=5)
+        self.digest_enabled_var = tk.BooleanVar(value=self.config["digest_enabled"])
+        ttk.Checkbutton(telegram_frame, variable=self.digest_enabled_var).grid(row=4, column=1, sticky=tk.W, pady=5)
+
+        ttk.Label(telegram_frame, text="Период сводки (минуты):").grid(row=5, column=0, sticky=tk.W, pady=5)
+        self.digest_window_var = tk.IntVar(value=self.config["digest_window"])
+        ttk.Spinbox(telegram_frame, from_=1, to=10080, textvariable=self.digest_window_var, width=10).grid(row=5, column=1, sticky=tk.W, pady=5)
+
+        ttk.Label(telegram_frame, text="Товаров в топе сводки:").grid(row=6, column=0, sticky=tk.W, pady=5)
+        self.digest_top_n_var = tk.IntVar(value=self.config["digest_top_n"])
+        ttk.Spinbox(telegram_frame, from_=1, to=100, textvariable=self.digest_top_n_var, width=10).grid(row=6, column=1, sticky=tk.W, pady=5)
+
+        # Help text
+        help_text = ("Вместо отчета после каждой проверки отправляется одна сводка\n"
+                     "за период с полным списком расхождений в CSV-файле.")
+        ttk.Label(telegram_frame, text=help_text, foreground="gray").grid(row=7, column=0, columnspan=2, sticky=tk.W, pady=5)
+
     def create_monitoring_tab(self):
         """Create monitoring settings tab"""
         monitoring_frame = ttk.Frame(self.notebook, padding=10)
@@ -139,6 +168,24 @@ class SettingsDialog(tk.Toplevel):
         help_text = "Выберите цены, которые нужно контролировать.\nЦена продавца всегда контролируется."
         ttk.Label(monitoring_frame, text=help_text, foreground="gray").grid(row=5, column=0, columnspan=2, sticky=tk.W, pady=5)
 
+        # Anomaly detection
+        ttk.Label(monitoring_frame, text="Уведомлять о резких изменениях цен:").grid(row=6, column=0, sticky=tk.W, pady=5)
+        self.anomaly_enabled_var = tk.BooleanVar(value=self.config["anomaly_enabled"])
+        ttk.Checkbutton(monitoring_frame, variable=self.anomaly_enabled_var).grid(row=6, column=1, sticky=tk.W, pady=5)
+
+        ttk.Label(monitoring_frame, text="Порог изменения (%):").grid(row=7, column=0, sticky=tk.W, pady=5)
+        self.anomaly_threshold_var = tk.IntVar(value=self.config["anomaly_threshold"])
+        ttk.Spinbox(monitoring_frame, from_=1, to=100, textvariable=self.anomaly_threshold_var, width=10).grid(row=7, column=1, sticky=tk.W, pady=5)
+
+        ttk.Label(monitoring_frame, text="Период истории (часы):").grid(row=8, column=0, sticky=tk.W, pady=5)
+        self.anomaly_window_var = tk.IntVar(value=self.config["anomaly_window_hours"])
+        ttk.Spinbox(monitoring_frame, from_=1, to=8760, textvariable=self.anomaly_window_var, width=10).grid(row=8, column=1, sticky=tk.W, pady=5)
+
+        # Help text
+        help_text = ("Цена сравнивается со сглаженным средним за указанный период,\n"
+                     "например, при применении акции Ozon.")
+        ttk.Label(monitoring_frame, text=help_text, foreground="gray").grid(row=9, column=0, columnspan=2, sticky=tk.W, pady=5)
+
     def create_timer_tab(self):
         """Create timer settings tab"""
         timer_frame = ttk.Frame(self.notebook, padding=10)
@@ -159,6 +206,96 @@ class SettingsDialog(tk.Toplevel):
         help_text = "Укажите интервал проверки цен в минутах.\nМинимум: 1 минута, максимум: 1440 минут (24 часа)"
         ttk.Label(timer_frame, text=help_text, foreground="gray").grid(row=2, column=0, columnspan=2, sticky=tk.W, pady=5)
 
+        # Profiling
+        ttk.Label(timer_frame, text="Профилирование проверок:").grid(row=3, column=0, sticky=tk.W, pady=5)
+        self.profiling_enabled_var = tk.BooleanVar(value=self.config["profiling_enabled"])
+        ttk.Checkbutton(timer_frame, variable=self.profiling_enabled_var).grid(row=3, column=1, sticky=tk.W, pady=5)
+
+        # Help text
+        help_text = ("Статистика cProfile и tracemalloc сохраняется в папку profiles.\n"
+                     "В Linux/macOS переключается сигналом SIGUSR1.")
+        ttk.Label(timer_frame, text=help_text, foreground="gray").grid(row=4, column=0, columnspan=2, sticky=tk.W, pady=5)
+
+    def create_api_server_tab(self):
+        """Create local status API settings tab"""
+        api_server_frame = ttk.Frame(self.notebook, padding=10)
+        self.notebook.add(api_server_frame, text="Локальный API")
+
+        # Enable API
+        ttk.Label(api_server_frame, text="Включить локальный API:").grid(row=0, column=0, sticky=tk.W, pady=5)
+        self.api_server_enabled_var = tk.BooleanVar(value=self.config["api_server_enabled"])
+        ttk.Checkbutton(api_server_frame, variable=self.api_server_enabled_var).grid(row=0, column=1, sticky=tk.W, pady=5)
+
+        # Host
+        ttk.Label(api_server_frame, text="Адрес:").grid(row=1, column=0, sticky=tk.W, pady=5)
+        self.api_server_host_var = tk.StringVar(value=self.config["api_server_host"])
+        ttk.Entry(api_server_frame, textvariable=self.api_server_host_var, width=20).grid(row=1, column=1, sticky=tk.W, pady=5)
+
+        # Port
+        ttk.Label(api_server_frame, text="Порт:").grid(row=2, column=0, sticky=tk.W, pady=5)
+        self.api_server_port_var = tk.IntVar(value=self.config["api_server_port"])
+        ttk.Spinbox(api_server_frame, from_=1, to=65535, textvariable=self.api_server_port_var, width=10).grid(row=2, column=1, sticky=tk.W, pady=5)
+
+        # Token
+        ttk.Label(api_server_frame, text="Токен (X-Api-Token):").grid(row=3, column=0, sticky=tk.W, pady=5)
+        self.api_server_token_var = tk.StringVar(value=self.config["api_server_token"])
+        ttk.Entry(api_server_frame, textvariable=self.api_server_token_var, width=30, show="*").grid(row=3, column=1, sticky=tk.W, pady=5)
+
+        # Help text
+        help_text = ("GET /status, GET /discrepancies?account=&since=\n"
+                     "POST /check, POST /stop (Content-Type: application/json)\n"
+                     "Для доступа только с этого компьютера оставьте 127.0.0.1,\n"
+                     "при доступе из сети обязательно задайте токен")
+        ttk.Label(api_server_frame, text=help_text, foreground="gray").grid(row=4, column=0, columnspan=2, sticky=tk.W, pady=5)
+
+    def create_export_tab(self):
+        """Create report export settings tab"""
+        export_frame = ttk.Frame(self.notebook, padding=10)
+        self.notebook.add(export_frame, text="Экспорт")
+
+        # Enable export
+        ttk.Label(export_frame, text="Экспортировать результаты:").grid(row=0, column=0, sticky=tk.W, pady=5)
+        self.export_enabled_var = tk.BooleanVar(value=self.config["export_enabled"])
+        ttk.Checkbutton(export_frame, variable=self.export_enabled_var).grid(row=0, column=1, sticky=tk.W, pady=5)
+
+        # Output directory
+        ttk.Label(export_frame, text="Папка:").grid(row=1, column=0, sticky=tk.W, pady=5)
+        self.export_dir_var = tk.StringVar(value=self.config["export_dir"])
+        dir_frame = ttk.Frame(export_frame)
+        dir_frame.grid(row=1, column=1, sticky=tk.W, pady=5)
+        ttk.Entry(dir_frame, textvariable=self.export_dir_var, width=28).pack(side=tk.LEFT)
+        ttk.Button(dir_frame, text="Обзор...", command=self.choose_export_dir).pack(side=tk.LEFT, padx=5)
+
+        # Formats
+        ttk.Label(export_frame, text="CSV:").grid(row=2, column=0, sticky=tk.W, pady=5)
+        self.export_csv_var = tk.BooleanVar(value=self.config["export_csv"])
+        ttk.Checkbutton(export_frame, variable=self.export_csv_var).grid(row=2, column=1, sticky=tk.W, pady=5)
+
+        ttk.Label(export_frame, text="Parquet:").grid(row=3, column=0, sticky=tk.W, pady=5)
+        self.export_parquet_var = tk.BooleanVar(value=self.config["export_parquet"])
+        ttk.Checkbutton(export_frame, variable=self.export_parquet_var).grid(row=3, column=1, sticky=tk.W, pady=5)
+
+        # Full price snapshot
+        ttk.Label(export_frame, text="Все цены (не только расхождения):").grid(row=4, column=0, sticky=tk.W, pady=5)
+        self.export_snapshot_var = tk.BooleanVar(value=self.config["export_snapshot"])
+        ttk.Checkbutton(export_frame, variable=self.export_snapshot_var).grid(row=4, column=1, sticky=tk.W, pady=5)
+
+        # Retention
+        ttk.Label(export_frame, text="Хранить файлы (дней):").grid(row=5, column=0, sticky=tk.W, pady=5)
+        self.export_retention_var = tk.IntVar(value=self.config["export_retention_days"])
+        ttk.Spinbox(export_frame, from_=0, to=3650, textvariable=self.export_retention_var, width=10).grid(row=5, column=1, sticky=tk.W, pady=5)
+
+        # Help text
+        help_text = ("Результаты каждой проверки записываются постранично.\n"
+                     "Для Parquet требуется пакет pyarrow. 0 дней - хранить всегда.")
+        ttk.Label(export_frame, text=help_text, foreground="gray").grid(row=6, column=0, columnspan=2, sticky=tk.W, pady=5)
+
+    def choose_export_dir(self):
+        """Choose export output directory"""
+        directory = filedialog.askdirectory(parent=self, initialdir=self.export_dir_var.get() or ".")
+        if directory:
+            self.export_dir_var.set(directory)
+
     def create_buttons(self):
         """Create dialog buttons"""
         button_frame = ttk.Frame(self)
@@ -188,6 +325,7 @@ class SettingsDialog(tk.Toplevel):
                 "parse_mode": "HTML"
             }
 
+            import requests
             response = requests.post(telegram_api_url, json=payload)
 
             if response.status_code == 200:
@@ -203,16 +341,36 @@ class SettingsDialog(tk.Toplevel):
         self.config["client_id"] = self.client_id_var.get()
         self.config["api_key"] = self.api_key_var.get()
         self.config["visibility"] = self.visibility_var.get()
+        self.config["record_api"] = self.record_api_var.get()
 
         self.config["telegram_bot_token"] = self.bot_token_var.get()
         self.config["telegram_channel"] = self.channel_var.get()
+        self.config["digest_enabled"] = self.digest_enabled_var.get()
+        self.config["digest_window"] = self.digest_window_var.get()
+        self.config["digest_top_n"] = self.digest_top_n_var.get()
 
         self.config["check_min_price"] = self.check_min_price_var.get()
         self.config["check_marketing_price"] = self.check_marketing_price_var.get()
         self.config["check_price"] = self.check_price_var.get()
+        self.config["anomaly_enabled"] = self.anomaly_enabled_var.get()
+        self.config["anomaly_threshold"] = self.anomaly_threshold_var.get()
+        self.config["anomaly_window_hours"] = self.anomaly_window_var.get()
 
         self.config["timer_interval"] = self.timer_interval_var.get()
         self.config["auto_start"] = self.auto_start_var.get()
+        self.config["profiling_enabled"] = self.profiling_enabled_var.get()
+
+        self.config["export_enabled"] = self.export_enabled_var.get()
+        self.config["export_dir"] = self.export_dir_var.get()
+        self.config["export_csv"] = self.export_csv_var.get()
+        self.config["export_parquet"] = self.export_parquet_var.get()
+        self.config["export_snapshot"] = self.export_snapshot_var.get()
+        self.config["export_retention_days"] = self.export_retention_var.get()
+
+        self.config["api_server_enabled"] = self.api_server_enabled_var.get()
+        self.config["api_server_host"] = self.api_server_host_var.get()
+        self.config["api_server_port"] = self.api_server_port_var.get()
+        self.config["api_server_token"] = self.api_server_token_var.get().strip()
 
         # Save config
         if config.save_config(self.config):